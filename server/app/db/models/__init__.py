@@ -0,0 +1,8 @@
+"""ORM models. Importing this package registers every table on Base.metadata."""
+from app.db.models.project import Base, Project
+from app.db.models.dataset import Dataset
+from app.db.models.canvas_state import CanvasState
+from app.db.models.chat_message import ChatMessage
+from app.db.models.dataset_profile_cache import DatasetProfileCache
+
+__all__ = ["Base", "Project", "Dataset", "CanvasState", "ChatMessage", "DatasetProfileCache"]
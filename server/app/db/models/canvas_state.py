@@ -1,6 +1,6 @@
-from datetime import datetime
-
-from sqlalchemy import Column, DateTime, ForeignKey, Integer, String, JSON
+from sqlalchemy import Column, DateTime, ForeignKey, Index, Integer, String
+from sqlalchemy.dialects.postgresql import JSONB
+from sqlalchemy.sql import func
 
 from app.db.models.project import Base
 
@@ -8,9 +8,17 @@ from app.db.models.project import Base
 class CanvasState(Base):
     """Stores React Flow canvas state (nodes and edges) per project."""
     __tablename__ = "canvas_states"
+    __table_args__ = (
+        # Enables @> containment queries over node data
+        Index("ix_canvas_nodes_gin", "nodes", postgresql_using="gin"),
+    )
 
     id = Column(Integer, primary_key=True, autoincrement=True)
     project_id = Column(String(6), ForeignKey("projects.project_id"), unique=True, index=True, nullable=False)
-    nodes = Column(JSON, default=list)
-    edges = Column(JSON, default=list)
-    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    nodes = Column(JSONB, default=list)
+    edges = Column(JSONB, default=list)
+    updated_at = Column(
+        DateTime,
+        server_default=func.timezone("utc", func.now()),
+        onupdate=func.timezone("utc", func.now()),
+    )
@@ -1,6 +1,5 @@
-from datetime import datetime
-
-from sqlalchemy import Column, DateTime, ForeignKey, Integer, String, Text
+from sqlalchemy import Column, DateTime, ForeignKey, Index, Integer, String, Text
+from sqlalchemy.sql import func
 
 from app.db.models.project import Base
 
@@ -8,10 +7,15 @@ from app.db.models.project import Base
 class ChatMessage(Base):
     """Stores chat messages for each project, organized by chat_id."""
     __tablename__ = "chat_messages"
+    __table_args__ = (
+        # Chat history is always read as "messages of (project, chat) in order"
+        Index("ix_chat_msgs_project_chat_created", "project_id", "chat_id", "created_at"),
+    )
 
     id = Column(Integer, primary_key=True, autoincrement=True)
-    project_id = Column(String(6), ForeignKey("projects.project_id"), index=True, nullable=False)
-    chat_id = Column(String(50), index=True, nullable=False)  # 'initial' for General chat, or node ID
+    project_id = Column(String(6), ForeignKey("projects.project_id"), nullable=False)
+    chat_id = Column(String(50), nullable=False)  # 'initial' for General chat, or node ID
     role = Column(String(20), nullable=False)  # 'user' or 'assistant'
     content = Column(Text, nullable=False)
-    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+    # clock_timestamp() (not now()) so rows inserted in one transaction keep their order
+    created_at = Column(DateTime, server_default=func.timezone("utc", func.clock_timestamp()), nullable=False)
@@ -1,21 +1,36 @@
-from datetime import datetime
-
-from sqlalchemy import Column, DateTime, ForeignKey, Integer, String
+from sqlalchemy import CheckConstraint, Column, DateTime, ForeignKey, Index, Integer, String
+from sqlalchemy.dialects.postgresql import JSONB
 from sqlalchemy.orm import relationship
+from sqlalchemy.sql import func
 
 from app.db.models.project import Base
 
 
 class Dataset(Base):
     __tablename__ = "datasets"
+    __table_args__ = (
+        # Covers dataset listings per project without touching the heap
+        Index(
+            "ix_datasets_project_covering",
+            "project_id",
+            postgresql_include=["dataset_id", "filename"],
+        ),
+        CheckConstraint("dataset_id ~ '^[A-Za-z0-9]{6}$'", name="datasets_id_format"),
+    )
 
     id = Column(Integer, primary_key=True, autoincrement=True)
     dataset_id = Column(String(6), unique=True, index=True, nullable=False)
-    project_id = Column(String(6), ForeignKey("projects.project_id"), index=True, nullable=False)
+    project_id = Column(String(6), ForeignKey("projects.project_id"), nullable=False)
     filename = Column(String(255), nullable=False)
     file_path = Column(String(512), nullable=False)
+    parquet_path = Column(String(512), nullable=True)  # Columnar copy written at upload
     file_size = Column(Integer, nullable=True)  # File size in bytes
-    uploaded_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+    column_schema = Column(JSONB, nullable=True)  # Column name -> dtype, recorded at upload
+    uploaded_at = Column(DateTime, server_default=func.timezone("utc", func.now()), nullable=False)
+
+    # Identify rows by the public dataset_id so Session.get() can resolve it
+    # from the identity map; the table keeps its integer surrogate key.
+    __mapper_args__ = {"primary_key": [dataset_id]}
 
     # Relationship
     project = relationship("Project", backref="datasets")
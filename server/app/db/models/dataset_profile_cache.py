@@ -0,0 +1,17 @@
+from sqlalchemy import JSON, Column, DateTime, ForeignKey, String
+from sqlalchemy.sql import func
+
+from app.db.models.project import Base
+
+
+class DatasetProfileCache(Base):
+    """Stores the computed profile of a dataset; datasets never change after upload."""
+    __tablename__ = "dataset_profile_cache"
+
+    dataset_id = Column(
+        String(6), ForeignKey("datasets.dataset_id", ondelete="CASCADE"), primary_key=True
+    )
+    # json, not jsonb: the payload is served back byte for byte, and jsonb
+    # would re-order its object keys
+    payload = Column(JSON, nullable=False)
+    computed_at = Column(DateTime, server_default=func.timezone("utc", func.now()), nullable=False)
@@ -1,15 +1,18 @@
-from datetime import datetime
-
-from sqlalchemy import Column, DateTime, Integer, String
+from sqlalchemy import CheckConstraint, Column, DateTime, Integer, String
 from sqlalchemy.orm import declarative_base
+from sqlalchemy.sql import func
 
 Base = declarative_base()
 
 
 class Project(Base):
     __tablename__ = "projects"
+    __table_args__ = (
+        # Public IDs are 6 base62 characters (see services/id_generator.py)
+        CheckConstraint("project_id ~ '^[A-Za-z0-9]{6}$'", name="projects_id_format"),
+    )
 
     id = Column(Integer, primary_key=True, autoincrement=True)
     project_id = Column(String(6), unique=True, index=True, nullable=False)
     name = Column(String(255), nullable=False)
-    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+    created_at = Column(DateTime, server_default=func.timezone("utc", func.now()), nullable=False)
@@ -1,9 +1,14 @@
 import os
-from typing import Generator
+import threading
+import time
+from contextvars import ContextVar
+from functools import lru_cache
+from typing import Generator, Optional
 
 from sqlalchemy import create_engine, text
 from sqlalchemy.engine import Engine
-from sqlalchemy.orm import Session, sessionmaker
+from sqlalchemy.orm import Session, scoped_session, sessionmaker
+from sqlalchemy.pool import QueuePool
 
 # Read database configuration from environment variables
 # Use 'or' to handle empty strings as well as None
@@ -19,27 +24,97 @@ DATABASE_URL = (
     f"@{POSTGRES_HOST}:{POSTGRES_PORT}/{POSTGRES_DB}"
 )
 
-# Create SQLAlchemy engine
-engine: Engine = create_engine(DATABASE_URL, pool_pre_ping=True)
+# Connection pool configuration
+# Defaults suit a single uvicorn worker talking to Postgres directly.
+# Behind PgBouncer in transaction pooling mode, set DB_PRE_PING=false and
+# DB_POOL_RECYCLE=60 so stale server connections are recycled by age instead
+# of being probed (the probe can leave backends "idle in transaction").
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE") or "20")
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW") or "10")
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE") or "1800")
+DB_POOL_TIMEOUT = int(os.getenv("DB_POOL_TIMEOUT") or "30")
+DB_PRE_PING = (os.getenv("DB_PRE_PING") or "true").lower() == "true"
+# Compiled-statement LRU shared by all connections; hot lookups reuse their SQL
+DB_QUERY_CACHE_SIZE = int(os.getenv("DB_QUERY_CACHE_SIZE") or "1000")
+
+
+@lru_cache(maxsize=1)
+def get_engine() -> Engine:
+    """Return the process-wide SQLAlchemy engine (one connection pool per process)."""
+    return create_engine(
+        DATABASE_URL,
+        poolclass=QueuePool,
+        pool_size=DB_POOL_SIZE,
+        max_overflow=DB_MAX_OVERFLOW,
+        pool_recycle=DB_POOL_RECYCLE,
+        pool_timeout=DB_POOL_TIMEOUT,
+        pool_pre_ping=DB_PRE_PING,
+        query_cache_size=DB_QUERY_CACHE_SIZE,
+    )
+
+
+engine: Engine = get_engine()
+
+# Identifies the HTTP request being served; set by DBSessionScopeMiddleware.
+# Threadpool calls inherit it, so every SessionLocal() made for one request
+# (dependency, helpers) returns the same session and pooled connection.
+request_scope: ContextVar[Optional[object]] = ContextVar("db_request_scope", default=None)
+
+
+def _session_scope() -> object:
+    scope = request_scope.get()
+    # Outside a request (startup, scripts) fall back to one session per thread
+    return scope if scope is not None else threading.get_ident()
+
 
 # Session factory
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+SessionLocal = scoped_session(
+    sessionmaker(autocommit=False, autoflush=False, bind=get_engine()),
+    scopefunc=_session_scope,
+)
 
 
 def get_db() -> Generator[Session, None, None]:
-    """Dependency for FastAPI routes to get DB session."""
+    """Dependency for FastAPI routes to get the request's DB session."""
     db = SessionLocal()
     try:
         yield db
     finally:
-        db.close()
+        SessionLocal.remove()
+
+
+class DBSessionScopeMiddleware:
+    """ASGI middleware giving each HTTP request its own session scope."""
+
+    def __init__(self, app) -> None:
+        self.app = app
+
+    async def __call__(self, scope, receive, send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        token = request_scope.set(object())
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            request_scope.reset(token)
+
+
+# Health checks hit test_connection() at 1Hz+; reuse a recent success instead
+# of running SELECT 1 (and holding a pool slot) on every probe.
+HEALTH_CHECK_TTL = float(os.getenv("DB_HEALTH_CHECK_TTL") or "5")
+_last_ok_ts = float("-inf")
 
 
 def test_connection() -> bool:
-    """Test database connection with a simple query."""
+    """Test database connection with a simple query, throttled to one probe per HEALTH_CHECK_TTL."""
+    global _last_ok_ts
+    if time.monotonic() - _last_ok_ts < HEALTH_CHECK_TTL:
+        return True
     try:
         with engine.connect() as conn:
             conn.execute(text("SELECT 1"))
+        _last_ok_ts = time.monotonic()
         return True
     except Exception:
         return False
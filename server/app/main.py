@@ -1,9 +1,12 @@
+import os
 from contextlib import asynccontextmanager
 
 from fastapi import FastAPI, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import ORJSONResponse
 
-from app.db.session import test_connection
+from app.db.session import DBSessionScopeMiddleware, test_connection
+from app.services.compute_pool import shutdown_executor, start_executor
 from app.routes.dataset_profile import router as dataset_profile_router
 from app.routes.dataset_visualization import router as dataset_viz_router
 from app.routes.datasets import router as datasets_router
@@ -15,14 +18,21 @@ from app.routes.chart_comparison import router as chart_comparison_router
 
 
 def init_db():
-    """Initialize database tables if DB is available."""
+    """
+    Initialize database tables if DB is available.
+
+    create_all reflects every table, so it only runs on an empty database or
+    when RUN_CREATE_ALL=1. Changes to existing tables are applied by /fix-db.
+    """
     try:
-        from app.db.models.project import Base
-        from app.db.models.dataset import Dataset  # Import to register model
-        from app.db.models.canvas_state import CanvasState  # Import to register model
-        from app.db.models.chat_message import ChatMessage  # Import to register model
+        from sqlalchemy import inspect
+
+        from app.db import models
         from app.db.session import engine
-        Base.metadata.create_all(bind=engine)
+        if os.getenv("RUN_CREATE_ALL", "0") != "1" and inspect(engine).has_table("projects"):
+            print("Database schema present, skipping create_all")
+            return
+        models.Base.metadata.create_all(bind=engine)
         print("Database tables created successfully")
     except Exception as e:
         print(f"Warning: Could not create database tables: {e}")
@@ -33,22 +43,64 @@ def init_db():
 async def lifespan(app: FastAPI):
     # Startup: Try to create tables
     init_db()
+    # Spawn compute workers now rather than on the first chart request, when
+    # COMPUTE_WORKERS sizes the pool explicitly
+    start_executor()
     yield
-    # Shutdown: cleanup if needed
+    # Shutdown: stop compute worker processes
+    shutdown_executor()
 
 
-app = FastAPI(title="Dataset Copilot Backend", lifespan=lifespan)
+# orjson encodes large analytics payloads much faster than the stdlib json
+# encoder, and FastAPI's ORJSONResponse already enables numpy serialization.
+app = FastAPI(
+    title="Dataset Copilot Backend",
+    default_response_class=ORJSONResponse,
+    lifespan=lifespan,
+)
 
-# Add CORS middleware
-# Note: Using wildcard for debugging CORS issues
-app.add_middleware(
-    CORSMiddleware,
-    allow_origins=["*"],  # Allow all origins for now
-    allow_credentials=False,  # Must be False when using wildcard origins
-    allow_methods=["*"],
-    allow_headers=["*"],
-    expose_headers=["*"],
+# Exact origins from CORS_ALLOW_ORIGINS (comma-separated) plus Vercel previews.
+# When unset, all origins are allowed.
+CORS_ALLOW_ORIGINS = frozenset(
+    origin.strip() for origin in os.getenv("CORS_ALLOW_ORIGINS", "").split(",") if origin.strip()
 )
+CORS_ALLOW_ORIGIN_REGEX = r"^https://dambo-[a-z0-9-]+\.vercel\.app$"
+
+
+class OriginSetCORSMiddleware(CORSMiddleware):
+    """CORSMiddleware that checks the exact-origin set before the regex."""
+
+    def is_allowed_origin(self, origin: str) -> bool:
+        if self.allow_all_origins or origin in CORS_ALLOW_ORIGINS:
+            return True
+        # Compiled once by CORSMiddleware.__init__
+        return self.allow_origin_regex is not None and self.allow_origin_regex.fullmatch(origin) is not None
+
+
+# Add CORS middleware
+if CORS_ALLOW_ORIGINS:
+    app.add_middleware(
+        OriginSetCORSMiddleware,
+        allow_origins=list(CORS_ALLOW_ORIGINS),
+        allow_origin_regex=CORS_ALLOW_ORIGIN_REGEX,
+        allow_credentials=False,
+        allow_methods=["*"],
+        allow_headers=["*"],
+        expose_headers=["*"],
+    )
+else:
+    # Note: Using wildcard for debugging CORS issues
+    app.add_middleware(
+        CORSMiddleware,
+        allow_origins=["*"],  # Allow all origins for now
+        allow_credentials=False,  # Must be False when using wildcard origins
+        allow_methods=["*"],
+        allow_headers=["*"],
+        expose_headers=["*"],
+    )
+
+# One scoped DB session per request
+app.add_middleware(DBSessionScopeMiddleware)
 
 # Include routers
 app.include_router(projects_router)
@@ -67,7 +119,62 @@ def fix_db():
     from sqlalchemy import text
     with engine.connect() as conn:
         conn.execute(text("ALTER TABLE datasets ADD COLUMN IF NOT EXISTS file_size INTEGER;"))
+        conn.execute(text("ALTER TABLE datasets ADD COLUMN IF NOT EXISTS parquet_path VARCHAR(512);"))
+        conn.execute(text("ALTER TABLE datasets ADD COLUMN IF NOT EXISTS column_schema JSONB;"))
+        # Converts canvas columns created as plain json
+        conn.execute(text("ALTER TABLE canvas_states ALTER COLUMN nodes TYPE jsonb USING nodes::jsonb;"))
+        conn.execute(text("ALTER TABLE canvas_states ALTER COLUMN edges TYPE jsonb USING edges::jsonb;"))
+        # Timestamps are filled in by Postgres
+        conn.execute(text("ALTER TABLE projects ALTER COLUMN created_at SET DEFAULT timezone('utc', now());"))
+        conn.execute(text("ALTER TABLE datasets ALTER COLUMN uploaded_at SET DEFAULT timezone('utc', now());"))
+        conn.execute(text("ALTER TABLE canvas_states ALTER COLUMN updated_at SET DEFAULT timezone('utc', now());"))
+        conn.execute(text(
+            "ALTER TABLE chat_messages ALTER COLUMN created_at SET DEFAULT timezone('utc', clock_timestamp());"
+        ))
+        conn.execute(text(
+            "CREATE TABLE IF NOT EXISTS dataset_profile_cache ("
+            "dataset_id VARCHAR(6) PRIMARY KEY REFERENCES datasets (dataset_id) ON DELETE CASCADE, "
+            "payload JSON NOT NULL, "
+            "computed_at TIMESTAMP WITHOUT TIME ZONE NOT NULL DEFAULT timezone('utc', now()));"
+        ))
+        # Profiles cached as jsonb came back with re-ordered keys; drop them
+        # and store the text verbatim from now on
+        conn.execute(text(
+            "DO $$ BEGIN IF EXISTS (SELECT 1 FROM information_schema.columns "
+            "WHERE table_name = 'dataset_profile_cache' AND column_name = 'payload' AND data_type = 'jsonb') THEN "
+            "TRUNCATE dataset_profile_cache; "
+            "ALTER TABLE dataset_profile_cache ALTER COLUMN payload TYPE json; "
+            "END IF; END $$;"
+        ))
+        # ID format checks; NOT VALID skips scanning rows that predate them
+        for table, column, name in (
+            ("projects", "project_id", "projects_id_format"),
+            ("datasets", "dataset_id", "datasets_id_format"),
+        ):
+            conn.execute(text(
+                f"DO $$ BEGIN IF NOT EXISTS (SELECT 1 FROM pg_constraint WHERE conname = '{name}') THEN "
+                f"ALTER TABLE {table} ADD CONSTRAINT {name} CHECK ({column} ~ '^[A-Za-z0-9]{{6}}$') NOT VALID; "
+                f"END IF; END $$;"
+            ))
         conn.commit()
+    # CONCURRENTLY avoids locking writes, but cannot run inside a transaction
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+        conn.execute(text(
+            "CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_chat_msgs_project_chat_created "
+            "ON chat_messages (project_id, chat_id, created_at);"
+        ))
+        conn.execute(text(
+            "CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_datasets_project_covering "
+            "ON datasets (project_id) INCLUDE (dataset_id, filename);"
+        ))
+        conn.execute(text(
+            "CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_canvas_nodes_gin "
+            "ON canvas_states USING gin (nodes);"
+        ))
+        # Superseded by the composite/covering indexes above
+        conn.execute(text("DROP INDEX CONCURRENTLY IF EXISTS ix_chat_messages_chat_id;"))
+        conn.execute(text("DROP INDEX CONCURRENTLY IF EXISTS ix_chat_messages_project_id;"))
+        conn.execute(text("DROP INDEX CONCURRENTLY IF EXISTS ix_datasets_project_id;"))
     return {"message": "Database schema updated successfully"}
 
 
@@ -77,7 +184,7 @@ async def root():
 
 
 @app.get("/db-health")
-async def db_health():
+def db_health():
     """Check database connectivity."""
     if test_connection():
         return {"database": "connected"}
@@ -1,51 +1,21 @@
 """Chart Comparison API Routes."""
 
 import logging
-from typing import Optional
 
 from fastapi import APIRouter, HTTPException, Body, Depends
-from pydantic import BaseModel
+from fastapi.concurrency import run_in_threadpool
 from sqlalchemy.orm import Session
 from app.db.session import get_db
+from app.schemas.chart_comparison import CompareRequest, CompareResponse
 from app.services.chart_comparison import compare_charts
-from app.services.dataset_loader import load_dataset
-from app.services.dataset_profiler import profile_dataframe
+from app.services.dataset_cache import get_cached_profile
+from app.services.dataset_loader import get_dataset_file_path
 
 logger = logging.getLogger(__name__)
 
 router = APIRouter(prefix="/charts", tags=["chart-comparison"])
 
 
-class ChartConfig(BaseModel):
-    """Chart configuration for comparison."""
-    type: str
-    props: dict
-
-
-class CompareRequest(BaseModel):
-    """Request body for chart comparison."""
-    chart1: ChartConfig
-    chart2: ChartConfig
-    datasetId: Optional[str] = None
-
-
-class ComparisonInsight(BaseModel):
-    """A single comparison insight."""
-    comparison_title: str
-    relationship_type: str
-    key_insights: list[str]
-    statistical_notes: str
-    recommendation: str
-    visualization_suggestion: Optional[dict] = None
-
-
-class CompareResponse(BaseModel):
-    """Response from chart comparison."""
-    success: bool
-    comparison: ComparisonInsight
-    charts: dict
-
-
 @router.post("/compare", response_model=CompareResponse)
 async def compare_charts_endpoint(
     request: CompareRequest,
@@ -62,15 +32,15 @@ async def compare_charts_endpoint(
         profile = None
         if request.datasetId:
             try:
-                # Load dataset and generate profile
-                df = load_dataset(db, request.datasetId)
-                profile = profile_dataframe(df)
+                # Profile is cached per dataset; a miss profiles in the compute pool
+                file_path = await run_in_threadpool(get_dataset_file_path, db, request.datasetId)
+                profile = await get_cached_profile(request.datasetId, file_path)
             except Exception as e:
                 logger.warning(f"Failed to get profile for comparison: {e}")
         
         result = await compare_charts(
-            chart1=request.chart1.model_dump(),
-            chart2=request.chart2.model_dump(),
+            chart1=request.chart1,
+            chart2=request.chart2,
             dataset_profile=profile
         )
         
@@ -1,32 +1,55 @@
-from fastapi import APIRouter, Depends, HTTPException
+import logging
+
+from fastapi import APIRouter, Depends, HTTPException, Response
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy.exc import SQLAlchemyError
 from sqlalchemy.orm import Session
 
-from app.db.models.dataset import Dataset
 from app.db.session import get_db
 from app.schemas.dataset_profile import DatasetProfileResponse
-from app.services.dataset_loader import load_dataset
-from app.services.dataset_profiler import profile_dataframe
+from app.services.dataset_cache import get_cached_profile, get_stored_profile_json, store_profile_json
+from app.services.dataset_loader import get_dataset_file_path
+
+logger = logging.getLogger(__name__)
 
 router = APIRouter()
 
 
 @router.get("/datasets/{dataset_id}/profile", response_model=DatasetProfileResponse)
-def get_dataset_profile(dataset_id: str, db: Session = Depends(get_db)):
+async def get_dataset_profile(dataset_id: str, db: Session = Depends(get_db)):
     """Get statistical profile of a dataset."""
+    # Serve a persisted profile as-is; Postgres already encoded it as JSON
+    try:
+        stored = await run_in_threadpool(get_stored_profile_json, db, dataset_id)
+    except SQLAlchemyError as e:
+        logger.warning(f"Profile cache lookup failed for {dataset_id}: {e}")
+        db.rollback()
+        stored = None
+    if stored is not None:
+        return Response(content=stored, media_type="application/json")
+
     # Validate dataset exists
-    dataset = db.query(Dataset).filter(Dataset.dataset_id == dataset_id).first()
-    if not dataset:
-        raise HTTPException(status_code=404, detail=f"Dataset not found: {dataset_id}")
+    try:
+        file_path = await run_in_threadpool(get_dataset_file_path, db, dataset_id)
+    except ValueError as e:
+        raise HTTPException(status_code=404, detail=str(e))
 
-    # Load DataFrame
+    # Profile in the compute pool unless a cached profile is available
     try:
-        df = load_dataset(db, dataset_id)
+        profile = await get_cached_profile(dataset_id, file_path)
     except FileNotFoundError as e:
         raise HTTPException(status_code=500, detail=str(e))
     except RuntimeError as e:
         raise HTTPException(status_code=500, detail=str(e))
 
-    # Generate profile
-    profile = profile_dataframe(df)
+    # Validate and encode once: the same JSON is persisted (so later requests
+    # skip profiling entirely) and sent, instead of FastAPI re-validating the
+    # model against response_model and serializing it again
+    payload = DatasetProfileResponse.model_validate(profile).model_dump_json()
+    try:
+        await run_in_threadpool(store_profile_json, db, dataset_id, payload)
+    except SQLAlchemyError as e:
+        logger.warning(f"Failed to persist profile for {dataset_id}: {e}")
+        db.rollback()
 
-    return profile
+    return Response(content=payload, media_type="application/json")
@@ -1,8 +1,8 @@
-from typing import Optional
-from fastapi import APIRouter, Depends, HTTPException, Query
+from typing import Optional, Sequence
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
+from fastapi.concurrency import run_in_threadpool
 from sqlalchemy.orm import Session
 
-from app.db.models.dataset import Dataset
 from app.db.session import get_db
 from app.schemas.dataset_visualization import (
     AreaChartResponse,
@@ -16,7 +16,8 @@ from app.schemas.dataset_visualization import (
     StackedBarResponse,
     TreemapResponse,
 )
-from app.services.dataset_loader import load_dataset
+from app.services.dataset_cache import get_cached_chart
+from app.services.dataset_loader import NUMERIC_COLUMNS, get_dataset_file_path, get_dataset_schema
 from app.services.dataset_visualizer import (
     get_area_data,
     get_bar_counts,
@@ -33,17 +34,32 @@ from app.services.dataset_visualizer import (
 router = APIRouter()
 
 
-def validate_dataset(dataset_id: str, db: Session) -> Dataset:
-    """Validate dataset exists and return it."""
-    dataset = db.query(Dataset).filter(Dataset.dataset_id == dataset_id).first()
-    if not dataset:
-        raise HTTPException(status_code=404, detail=f"Dataset not found: {dataset_id}")
-    return dataset
-
-
-
-@router.get("/datasets/{dataset_id}/histogram", response_model=HistogramResponse)
-def get_histogram_data(
+def validate_dataset(dataset_id: str, db: Session, required_columns: Sequence[str] = ()) -> str:
+    """
+    Validate dataset exists and return its file path. Required columns are
+    checked against the schema recorded at upload, so a bad column name is
+    rejected without reading the file.
+    """
+    try:
+        file_path = get_dataset_file_path(db, dataset_id)
+        schema = get_dataset_schema(db, dataset_id)
+    except ValueError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    if schema is not None:
+        for col in required_columns:
+            if col not in schema:
+                raise HTTPException(status_code=400, detail=f"Column not found: {col}")
+    return file_path
+
+
+# Chart computation runs in the compute process pool (app.services.compute_pool);
+# only the dataset lookup runs in this process. Each route names the columns it
+# reads so only those are decoded and filtered. Results are built by trusted
+# service code, so they are encoded as-is instead of being re-validated against
+# the response schemas, which only document the endpoints, and the encoded body
+# is cached (app.services.dataset_cache) for repeat requests.
+@router.get("/datasets/{dataset_id}/histogram", response_model=None, responses={200: {"model": HistogramResponse}})
+async def get_histogram_data(
     dataset_id: str,
     column: str = Query(..., description="Column name for histogram"),
     bins: int = Query(10, ge=1, le=100, description="Number of bins"),
@@ -53,23 +69,23 @@ def get_histogram_data(
     db: Session = Depends(get_db)
 ):
     """Get histogram data for a numeric column."""
-    validate_dataset(dataset_id, db)
+    file_path = await run_in_threadpool(validate_dataset, dataset_id, db, [column])
 
     try:
-        df = load_dataset(db, dataset_id)
+        body = await get_cached_chart(
+            get_histogram, file_path, column, bins,
+            columns=[column], row_filter=(filter_column, filter_operator, filter_value),
+        )
     except (FileNotFoundError, RuntimeError) as e:
         raise HTTPException(status_code=500, detail=str(e))
-
-    try:
-        result = get_histogram(df, column, bins, filter_column, filter_operator, filter_value)
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
 
-    return result
+    return Response(content=body, media_type="application/json")
 
 
-@router.get("/datasets/{dataset_id}/bar", response_model=BarChartResponse)
-def get_bar_data(
+@router.get("/datasets/{dataset_id}/bar", response_model=None, responses={200: {"model": BarChartResponse}})
+async def get_bar_data(
     dataset_id: str,
     column: str = Query(..., description="Column name for bar chart"),
     filter_column: Optional[str] = Query(None, description="Column to filter by"),
@@ -78,23 +94,23 @@ def get_bar_data(
     db: Session = Depends(get_db)
 ):
     """Get bar chart data for a categorical column."""
-    validate_dataset(dataset_id, db)
+    file_path = await run_in_threadpool(validate_dataset, dataset_id, db, [column])
 
     try:
-        df = load_dataset(db, dataset_id)
+        body = await get_cached_chart(
+            get_bar_counts, file_path, column,
+            columns=[column], row_filter=(filter_column, filter_operator, filter_value),
+        )
     except (FileNotFoundError, RuntimeError) as e:
         raise HTTPException(status_code=500, detail=str(e))
-
-    try:
-        result = get_bar_counts(df, column, filter_column, filter_operator, filter_value)
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
 
-    return result
+    return Response(content=body, media_type="application/json")
 
 
-@router.get("/datasets/{dataset_id}/scatter", response_model=ScatterResponse)
-def get_scatter_data(
+@router.get("/datasets/{dataset_id}/scatter", response_model=None, responses={200: {"model": ScatterResponse}})
+async def get_scatter_data(
     dataset_id: str,
     x: str = Query(..., description="X-axis column"),
     y: str = Query(..., description="Y-axis column"),
@@ -104,23 +120,23 @@ def get_scatter_data(
     db: Session = Depends(get_db)
 ):
     """Get scatter plot data for two numeric columns."""
-    validate_dataset(dataset_id, db)
+    file_path = await run_in_threadpool(validate_dataset, dataset_id, db, [x, y])
 
     try:
-        df = load_dataset(db, dataset_id)
+        body = await get_cached_chart(
+            get_scatter, file_path, x, y,
+            columns=[x, y], row_filter=(filter_column, filter_operator, filter_value),
+        )
     except (FileNotFoundError, RuntimeError) as e:
         raise HTTPException(status_code=500, detail=str(e))
-
-    try:
-        result = get_scatter(df, x, y, filter_column, filter_operator, filter_value)
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
 
-    return result
+    return Response(content=body, media_type="application/json")
 
 
-@router.get("/datasets/{dataset_id}/correlation", response_model=CorrelationResponse)
-def get_correlation_data(
+@router.get("/datasets/{dataset_id}/correlation", response_model=None, responses={200: {"model": CorrelationResponse}})
+async def get_correlation_data(
     dataset_id: str,
     filter_column: Optional[str] = Query(None, description="Column to filter by"),
     filter_operator: Optional[str] = Query(None, description="Filter operator"),
@@ -128,21 +144,23 @@ def get_correlation_data(
     db: Session = Depends(get_db)
 ):
     """Get correlation matrix for all numeric columns."""
-    validate_dataset(dataset_id, db)
+    file_path = await run_in_threadpool(validate_dataset, dataset_id, db)
 
     try:
-        df = load_dataset(db, dataset_id)
+        body = await get_cached_chart(
+            get_correlation, file_path,
+            columns=NUMERIC_COLUMNS, row_filter=(filter_column, filter_operator, filter_value),
+        )
     except (FileNotFoundError, RuntimeError) as e:
         raise HTTPException(status_code=500, detail=str(e))
 
-    result = get_correlation(df, filter_column, filter_operator, filter_value)
-    return result
+    return Response(content=body, media_type="application/json")
 
 
 # ============ New Chart Endpoints ============
 
-@router.get("/datasets/{dataset_id}/line", response_model=LineChartResponse)
-def get_line_chart_data(
+@router.get("/datasets/{dataset_id}/line", response_model=None, responses={200: {"model": LineChartResponse}})
+async def get_line_chart_data(
     dataset_id: str,
     date_column: str = Query(..., description="Date/time column"),
     value_column: str = Query(..., description="Value column to plot"),
@@ -153,23 +171,23 @@ def get_line_chart_data(
     db: Session = Depends(get_db)
 ):
     """Get line chart data for time series visualization."""
-    validate_dataset(dataset_id, db)
+    file_path = await run_in_threadpool(validate_dataset, dataset_id, db, [date_column, value_column])
 
     try:
-        df = load_dataset(db, dataset_id)
+        body = await get_cached_chart(
+            get_line_data, file_path, date_column, value_column, group_column,
+            columns=[date_column, value_column, group_column], row_filter=(filter_column, filter_operator, filter_value),
+        )
     except (FileNotFoundError, RuntimeError) as e:
         raise HTTPException(status_code=500, detail=str(e))
-
-    try:
-        result = get_line_data(df, date_column, value_column, group_column, filter_column, filter_operator, filter_value)
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
 
-    return result
+    return Response(content=body, media_type="application/json")
 
 
-@router.get("/datasets/{dataset_id}/pie", response_model=PieChartResponse)
-def get_pie_chart_data(
+@router.get("/datasets/{dataset_id}/pie", response_model=None, responses={200: {"model": PieChartResponse}})
+async def get_pie_chart_data(
     dataset_id: str,
     column: str = Query(..., description="Categorical column for pie chart"),
     limit: int = Query(10, ge=1, le=20, description="Max number of slices"),
@@ -179,23 +197,23 @@ def get_pie_chart_data(
     db: Session = Depends(get_db)
 ):
     """Get pie/donut chart data for categorical breakdown."""
-    validate_dataset(dataset_id, db)
+    file_path = await run_in_threadpool(validate_dataset, dataset_id, db, [column])
 
     try:
-        df = load_dataset(db, dataset_id)
+        body = await get_cached_chart(
+            get_pie_data, file_path, column, limit,
+            columns=[column], row_filter=(filter_column, filter_operator, filter_value),
+        )
     except (FileNotFoundError, RuntimeError) as e:
         raise HTTPException(status_code=500, detail=str(e))
-
-    try:
-        result = get_pie_data(df, column, limit, filter_column, filter_operator, filter_value)
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
 
-    return result
+    return Response(content=body, media_type="application/json")
 
 
-@router.get("/datasets/{dataset_id}/area", response_model=AreaChartResponse)
-def get_area_chart_data(
+@router.get("/datasets/{dataset_id}/area", response_model=None, responses={200: {"model": AreaChartResponse}})
+async def get_area_chart_data(
     dataset_id: str,
     date_column: str = Query(..., description="Date/time column"),
     value_column: str = Query(..., description="Value column to stack"),
@@ -206,23 +224,23 @@ def get_area_chart_data(
     db: Session = Depends(get_db)
 ):
     """Get stacked area chart data."""
-    validate_dataset(dataset_id, db)
+    file_path = await run_in_threadpool(validate_dataset, dataset_id, db, [date_column, value_column, stack_column])
 
     try:
-        df = load_dataset(db, dataset_id)
+        body = await get_cached_chart(
+            get_area_data, file_path, date_column, value_column, stack_column,
+            columns=[date_column, value_column, stack_column], row_filter=(filter_column, filter_operator, filter_value),
+        )
     except (FileNotFoundError, RuntimeError) as e:
         raise HTTPException(status_code=500, detail=str(e))
-
-    try:
-        result = get_area_data(df, date_column, value_column, stack_column, filter_column, filter_operator, filter_value)
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
 
-    return result
+    return Response(content=body, media_type="application/json")
 
 
-@router.get("/datasets/{dataset_id}/boxplot", response_model=BoxPlotResponse)
-def get_boxplot_data(
+@router.get("/datasets/{dataset_id}/boxplot", response_model=None, responses={200: {"model": BoxPlotResponse}})
+async def get_boxplot_data(
     dataset_id: str,
     column: str = Query(..., description="Numeric column for box plot"),
     filter_column: Optional[str] = Query(None, description="Column to filter by"),
@@ -231,23 +249,23 @@ def get_boxplot_data(
     db: Session = Depends(get_db)
 ):
     """Get box plot statistics (quartiles, outliers)."""
-    validate_dataset(dataset_id, db)
+    file_path = await run_in_threadpool(validate_dataset, dataset_id, db, [column])
 
     try:
-        df = load_dataset(db, dataset_id)
+        body = await get_cached_chart(
+            get_boxplot, file_path, column,
+            columns=[column], row_filter=(filter_column, filter_operator, filter_value),
+        )
     except (FileNotFoundError, RuntimeError) as e:
         raise HTTPException(status_code=500, detail=str(e))
-
-    try:
-        result = get_boxplot(df, column, filter_column, filter_operator, filter_value)
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
 
-    return result
+    return Response(content=body, media_type="application/json")
 
 
-@router.get("/datasets/{dataset_id}/treemap", response_model=TreemapResponse)
-def get_treemap_chart_data(
+@router.get("/datasets/{dataset_id}/treemap", response_model=None, responses={200: {"model": TreemapResponse}})
+async def get_treemap_chart_data(
     dataset_id: str,
     group_columns: str = Query(..., description="Comma-separated grouping columns"),
     value_column: str = Query(..., description="Value column for sizing"),
@@ -257,24 +275,24 @@ def get_treemap_chart_data(
     db: Session = Depends(get_db)
 ):
     """Get treemap data for hierarchical visualization."""
-    validate_dataset(dataset_id, db)
+    group_cols = [col.strip() for col in group_columns.split(",")]
+    file_path = await run_in_threadpool(validate_dataset, dataset_id, db, [*group_cols, value_column])
 
     try:
-        df = load_dataset(db, dataset_id)
+        body = await get_cached_chart(
+            get_treemap_data, file_path, group_cols, value_column,
+            columns=[*group_cols, value_column], row_filter=(filter_column, filter_operator, filter_value),
+        )
     except (FileNotFoundError, RuntimeError) as e:
         raise HTTPException(status_code=500, detail=str(e))
-
-    try:
-        group_cols = [col.strip() for col in group_columns.split(",")]
-        result = get_treemap_data(df, group_cols, value_column, filter_column, filter_operator, filter_value)
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
 
-    return result
+    return Response(content=body, media_type="application/json")
 
 
-@router.get("/datasets/{dataset_id}/stacked-bar", response_model=StackedBarResponse)
-def get_stacked_bar_data(
+@router.get("/datasets/{dataset_id}/stacked-bar", response_model=None, responses={200: {"model": StackedBarResponse}})
+async def get_stacked_bar_data(
     dataset_id: str,
     category_column: str = Query(..., description="Category axis column"),
     stack_column: str = Query(..., description="Column to stack by"),
@@ -285,17 +303,17 @@ def get_stacked_bar_data(
     db: Session = Depends(get_db)
 ):
     """Get stacked bar chart data."""
-    validate_dataset(dataset_id, db)
+    file_path = await run_in_threadpool(validate_dataset, dataset_id, db, [category_column, stack_column])
 
     try:
-        df = load_dataset(db, dataset_id)
+        body = await get_cached_chart(
+            get_stacked_bar, file_path, category_column, stack_column, value_column,
+            columns=[category_column, stack_column, value_column], row_filter=(filter_column, filter_operator, filter_value),
+        )
     except (FileNotFoundError, RuntimeError) as e:
         raise HTTPException(status_code=500, detail=str(e))
-
-    try:
-        result = get_stacked_bar(df, category_column, stack_column, value_column, filter_column, filter_operator, filter_value)
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
 
-    return result
+    return Response(content=body, media_type="application/json")
 
@@ -1,20 +1,92 @@
+import asyncio
+import logging
+import os
+from typing import BinaryIO, Optional
+
 from fastapi import APIRouter, Depends, File, HTTPException, UploadFile
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import delete, select
 from sqlalchemy.orm import Session
 
 from app.db.models.dataset import Dataset
 from app.db.models.project import Project
 from app.db.session import get_db
 from app.schemas.dataset import DatasetListItem, DatasetResponse
+from app.services.dataset_cache import invalidate_dataset
+from app.services.dataset_loader import csv_to_parquet
 from app.services.file_storage import save_file
-from app.services.id_generator import generate_unique_id
+from app.services.id_generator import insert_with_unique_id
+
+logger = logging.getLogger(__name__)
 
 router = APIRouter()
 
 
-def get_existing_dataset_ids(db: Session, project_id: str) -> set[str]:
-    """Get all existing dataset_ids for a project."""
-    results = db.query(Dataset.dataset_id).filter(Dataset.project_id == project_id).all()
-    return {r[0] for r in results}
+def project_exists(db: Session, project_id: str) -> bool:
+    """Check a project exists by primary key without loading the row."""
+    return db.execute(
+        select(Project.project_id).where(Project.project_id == project_id)
+    ).scalar_one_or_none() is not None
+
+
+def parquet_copy(dataset_id: str, content: BinaryIO) -> tuple[Optional[bytes], Optional[dict]]:
+    """
+    Convert an uploaded CSV to Parquet; returns the Parquet bytes and the
+    column schema, or (None, None) if conversion fails.
+    """
+    try:
+        content.seek(0)
+        return csv_to_parquet(content)
+    except Exception as e:
+        logger.warning(f"Parquet conversion failed for {dataset_id}, serving CSV: {e}")
+        return None, None
+
+
+def store_parquet_copy(project_id: str, dataset_id: str, parquet: Optional[bytes]) -> Optional[str]:
+    """Save the Parquet copy of an upload; returns its path, or None if there is none."""
+    if parquet is None:
+        return None
+    try:
+        return save_file(project_id, dataset_id, parquet, extension="parquet")
+    except Exception as e:
+        logger.warning(f"Parquet upload failed for {dataset_id}, serving CSV: {e}")
+        return None
+
+
+def claim_dataset(db: Session, project_id: str, filename: str, file_size: int) -> str:
+    """
+    Commit a placeholder row under a new unique dataset_id and return the ID.
+    Committing before the files are stored keeps no transaction open during
+    the upload. Until record_dataset_files fills in file_path the row is
+    unfinished: it is not listed and cannot be read.
+    """
+    dataset = insert_with_unique_id(
+        db, Dataset, "dataset_id",
+        {"project_id": project_id, "filename": filename, "file_path": "", "file_size": file_size},
+    )
+    dataset_id = dataset.dataset_id
+    db.commit()
+    return dataset_id
+
+
+def discard_dataset(db: Session, dataset_id: str) -> None:
+    """Delete the placeholder row of an upload that failed."""
+    db.rollback()
+    db.execute(delete(Dataset).where(Dataset.dataset_id == dataset_id))
+    db.commit()
+
+
+def record_dataset_files(
+    db: Session, dataset_id: str, file_path: str, parquet_path: Optional[str], schema: Optional[dict]
+) -> Dataset:
+    """Fill in the stored file paths on a claimed row and commit it."""
+    dataset = db.get(Dataset, dataset_id)
+    dataset.file_path = file_path
+    dataset.parquet_path = parquet_path
+    dataset.column_schema = schema if parquet_path else None
+    db.commit()
+    db.refresh(dataset)
+    return dataset
 
 
 @router.post("/projects/{project_id}/datasets", response_model=DatasetResponse)
@@ -24,38 +96,44 @@ async def upload_dataset(
     db: Session = Depends(get_db)
 ):
     """Upload a CSV file to a project."""
-    # Validate project exists
-    project = db.query(Project).filter(Project.project_id == project_id).first()
-    if not project:
+    # Validate project exists. Every DB call runs in the threadpool, off the loop
+    if not await run_in_threadpool(project_exists, db, project_id):
         raise HTTPException(status_code=404, detail=f"Project not found: {project_id}")
 
     # Validate file extension
     if not file.filename or not file.filename.endswith(".csv"):
         raise HTTPException(status_code=400, detail="Only CSV files are accepted")
 
-    # Read file content
-    content = await file.read()
-    if not content:
+    # Starlette has already spooled the upload to a temp file; stream from it
+    # instead of reading the whole body into memory
+    content = file.file
+    file_size = content.seek(0, os.SEEK_END)
+    if not file_size:
         raise HTTPException(status_code=400, detail="Empty file uploaded")
+    content.seek(0)
 
-    # Generate unique dataset_id
-    existing_ids = get_existing_dataset_ids(db, project_id)
-    dataset_id = generate_unique_id(existing_ids)
+    # Claim a unique dataset_id before writing any file under it. If storing
+    # the files fails, the placeholder row is deleted again.
+    dataset_id = await run_in_threadpool(claim_dataset, db, project_id, file.filename, file_size)
 
-    # Save file to disk
-    file_path = save_file(project_id, dataset_id, content)
+    try:
+        # Reads use the Parquet copy when present, skipping CSV parsing and type inference
+        parquet, schema = await run_in_threadpool(parquet_copy, dataset_id, content)
+        content.seek(0)
+        # Store the CSV, zstd-compressed, and its Parquet copy to disk (or
+        # Cloudinary) side by side, without blocking the event loop
+        file_path, parquet_path = await asyncio.gather(
+            run_in_threadpool(save_file, project_id, dataset_id, content, extension="csv.zst"),
+            run_in_threadpool(store_parquet_copy, project_id, dataset_id, parquet),
+        )
+    except BaseException:
+        await run_in_threadpool(discard_dataset, db, dataset_id)
+        raise
 
-    # Create database record
-    dataset = Dataset(
-        dataset_id=dataset_id,
-        project_id=project_id,
-        filename=file.filename,
-        file_path=file_path,
-        file_size=len(content)
+    dataset = await run_in_threadpool(
+        record_dataset_files, db, dataset_id, file_path, parquet_path, schema
     )
-    db.add(dataset)
-    db.commit()
-    db.refresh(dataset)
+    invalidate_dataset(dataset_id, dataset.parquet_path or dataset.file_path)
 
     return dataset
 
@@ -64,13 +142,12 @@ async def upload_dataset(
 def list_datasets(project_id: str, db: Session = Depends(get_db)):
     """List all datasets for a project."""
     # Validate project exists
-    project = db.query(Project).filter(Project.project_id == project_id).first()
-    if not project:
+    if not project_exists(db, project_id):
         raise HTTPException(status_code=404, detail=f"Project not found: {project_id}")
 
     datasets = (
         db.query(Dataset)
-        .filter(Dataset.project_id == project_id)
+        .filter(Dataset.project_id == project_id, Dataset.file_path != "")
         .order_by(Dataset.uploaded_at.desc())
         .all()
     )
@@ -1,6 +1,8 @@
 from datetime import datetime
+from typing import Optional
 
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
+from sqlalchemy import func, text, tuple_
 from sqlalchemy.orm import Session
 
 from app.db.models.canvas_state import CanvasState
@@ -9,7 +11,8 @@ from app.db.session import get_db
 from app.schemas.persistence import (
     CanvasStateCreate,
     CanvasStateResponse,
-    ChatListItem,
+    ChatMessageCursor,
+    ChatMessagePage,
     ChatsPayload,
 )
 
@@ -21,8 +24,19 @@ router = APIRouter()
 @router.get("/projects/{project_id}/canvas", response_model=CanvasStateResponse)
 def get_canvas_state(project_id: str, db: Session = Depends(get_db)):
     """Get canvas state (nodes/edges) for a project."""
-    state = db.query(CanvasState).filter(CanvasState.project_id == project_id).first()
-    if not state:
+    # Let Postgres encode the stored JSONB so large graphs skip a Python decode/encode pass
+    payload = db.execute(
+        text(
+            "SELECT json_build_object("
+            "'project_id', project_id, "
+            "'nodes', coalesce(nodes, '[]'::jsonb), "
+            "'edges', coalesce(edges, '[]'::jsonb), "
+            "'updated_at', updated_at)::text "
+            "FROM canvas_states WHERE project_id = :project_id"
+        ),
+        {"project_id": project_id},
+    ).scalar_one_or_none()
+    if payload is None:
         # Return empty canvas if no state exists
         return CanvasStateResponse(
             project_id=project_id,
@@ -30,7 +44,7 @@ def get_canvas_state(project_id: str, db: Session = Depends(get_db)):
             edges=[],
             updated_at=None
         )
-    return state
+    return Response(content=payload, media_type="application/json")
 
 
 @router.put("/projects/{project_id}/canvas", response_model=CanvasStateResponse)
@@ -41,7 +55,7 @@ def save_canvas_state(project_id: str, data: CanvasStateCreate, db: Session = De
     if state:
         state.nodes = data.nodes
         state.edges = data.edges
-        state.updated_at = datetime.utcnow()
+        state.updated_at = func.timezone("utc", func.now())
     else:
         state = CanvasState(
             project_id=project_id,
@@ -70,52 +84,74 @@ def clear_canvas_state(project_id: str, db: Session = Depends(get_db)):
 @router.get("/projects/{project_id}/chats", response_model=ChatsPayload)
 def get_chats(project_id: str, db: Session = Depends(get_db)):
     """Get all chat messages for a project, grouped by chat_id."""
-    messages = (
-        db.query(ChatMessage)
-        .filter(ChatMessage.project_id == project_id)
-        .order_by(ChatMessage.chat_id, ChatMessage.created_at)
-        .all()
+    # Group and encode in Postgres so the handler never builds a row object per message
+    payload = db.execute(
+        text(
+            "SELECT json_build_object('chats', coalesce(json_agg(json_build_object("
+            "'id', chat_id, "
+            "'title', CASE WHEN chat_id = 'initial' THEN 'General' ELSE chat_id END, "
+            "'messages', messages) ORDER BY chat_id), '[]'::json))::text "
+            "FROM ("
+            "SELECT chat_id, json_agg(json_build_object('role', role, 'content', content) "
+            "ORDER BY created_at, id) AS messages "
+            "FROM chat_messages WHERE project_id = :project_id GROUP BY chat_id"
+            ") AS chats"
+        ),
+        {"project_id": project_id},
+    ).scalar_one()
+    return Response(content=payload, media_type="application/json")
+
+
+@router.get("/projects/{project_id}/chats/{chat_id}/messages", response_model=ChatMessagePage)
+def get_chat_messages(
+    project_id: str,
+    chat_id: str,
+    after_ts: Optional[datetime] = Query(None, description="created_at of the last message seen"),
+    after_id: Optional[int] = Query(None, description="id of the last message seen"),
+    limit: int = Query(50, ge=1, le=200, description="Page size"),
+    db: Session = Depends(get_db)
+):
+    """Get one page of a chat's messages in order, resuming after a cursor."""
+    if (after_ts is None) != (after_id is None):
+        raise HTTPException(status_code=400, detail="after_ts and after_id must be given together")
+
+    query = db.query(ChatMessage).filter(
+        ChatMessage.project_id == project_id,
+        ChatMessage.chat_id == chat_id,
     )
-    
-    # Group messages by chat_id
-    chats_dict: dict[str, list[dict]] = {}
-    for msg in messages:
-        if msg.chat_id not in chats_dict:
-            chats_dict[msg.chat_id] = []
-        chats_dict[msg.chat_id].append({
-            "role": msg.role,
-            "content": msg.content
-        })
-    
-    # Convert to ChatListItem format
-    chats = [
-        ChatListItem(
-            id=chat_id,
-            title="General" if chat_id == "initial" else chat_id,
-            messages=msgs
-        )
-        for chat_id, msgs in chats_dict.items()
-    ]
-    
-    return ChatsPayload(chats=chats)
+    if after_ts is not None:
+        # Seek past the cursor instead of OFFSET, so every page costs the same
+        query = query.filter(tuple_(ChatMessage.created_at, ChatMessage.id) > (after_ts, after_id))
+    messages = query.order_by(ChatMessage.created_at, ChatMessage.id).limit(limit).all()
+
+    next_cursor = None
+    if len(messages) == limit:
+        last = messages[-1]
+        next_cursor = ChatMessageCursor(after_ts=last.created_at, after_id=last.id)
+
+    return ChatMessagePage(messages=messages, next=next_cursor)
 
 
 @router.put("/projects/{project_id}/chats")
 def save_chats(project_id: str, data: ChatsPayload, db: Session = Depends(get_db)):
     """Save all chat messages for a project (replaces existing)."""
     # Delete existing messages for this project
-    db.query(ChatMessage).filter(ChatMessage.project_id == project_id).delete()
+    db.query(ChatMessage).filter(ChatMessage.project_id == project_id).delete(synchronize_session=False)
     
-    # Insert new messages
-    for chat in data.chats:
-        for msg in chat.messages:
-            db_msg = ChatMessage(
-                project_id=project_id,
-                chat_id=chat.id,
-                role=msg.get("role", "user"),
-                content=msg.get("content", "")
-            )
-            db.add(db_msg)
+    # Insert new messages in one executemany instead of one INSERT per message;
+    # id order keeps ties on created_at in submission order
+    rows = [
+        {
+            "project_id": project_id,
+            "chat_id": chat.id,
+            "role": msg.get("role", "user"),
+            "content": msg.get("content", ""),
+        }
+        for chat in data.chats
+        for msg in chat.messages
+    ]
+    if rows:
+        db.bulk_insert_mappings(ChatMessage, rows)
     
     db.commit()
     return {"status": "saved", "chat_count": len(data.chats)}
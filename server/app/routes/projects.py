@@ -4,28 +4,15 @@ from sqlalchemy.orm import Session
 from app.db.models.project import Project
 from app.db.session import get_db
 from app.schemas.project import ProjectCreate, ProjectResponse, ProjectUpdate
-from app.services.id_generator import generate_unique_id
+from app.services.id_generator import insert_with_unique_id
 
 router = APIRouter()
 
 
-def get_existing_project_ids(db: Session) -> set[str]:
-    """Get all existing project_ids from database."""
-    results = db.query(Project.project_id).all()
-    return {r[0] for r in results}
-
-
 @router.post("/projects", response_model=ProjectResponse)
 def create_project(project_data: ProjectCreate, db: Session = Depends(get_db)):
     """Create a new project with a unique 6-char ID."""
-    existing_ids = get_existing_project_ids(db)
-    project_id = generate_unique_id(existing_ids)
-
-    project = Project(
-        project_id=project_id,
-        name=project_data.name
-    )
-    db.add(project)
+    project = insert_with_unique_id(db, Project, "project_id", {"name": project_data.name})
     db.commit()
     db.refresh(project)
 
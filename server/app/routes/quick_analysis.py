@@ -2,12 +2,14 @@
 
 import logging
 from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import ORJSONResponse
 from sqlalchemy.orm import Session
 
-from app.db.models.dataset import Dataset
 from app.db.session import get_db
-from app.schemas.quick_analysis import QuickAnalysisResponse
-from app.services.dataset_loader import load_dataset
+from app.schemas.quick_analysis import GeminiInsights, QuickAnalysisResponse
+from app.services.compute_pool import run_on_dataset
+from app.services.dataset_loader import get_dataset_file_path
 from app.services.quick_analyzer import quick_analyze_dataframe
 from app.services.gemini_analyzer import analyze_with_gemini
 
@@ -24,30 +26,34 @@ async def get_quick_analysis(
 ):
     """Get comprehensive quick analysis of a dataset with optional AI insights."""
     # Validate dataset exists
-    dataset = db.query(Dataset).filter(Dataset.dataset_id == dataset_id).first()
-    if not dataset:
-        raise HTTPException(status_code=404, detail=f"Dataset not found: {dataset_id}")
+    try:
+        file_path = await run_in_threadpool(get_dataset_file_path, db, dataset_id)
+    except ValueError as e:
+        raise HTTPException(status_code=404, detail=str(e))
 
-    # Load DataFrame
+    # Load and analyze in the compute pool: the pandas work holds the GIL,
+    # so a worker thread would still stall the event loop and other requests
     try:
-        df = load_dataset(db, dataset_id)
+        analysis = await run_on_dataset(quick_analyze_dataframe, file_path)
     except FileNotFoundError as e:
         raise HTTPException(status_code=500, detail=str(e))
     except RuntimeError as e:
         raise HTTPException(status_code=500, detail=str(e))
 
-    # Generate quick analysis
-    analysis = quick_analyze_dataframe(df)
-
     # Optionally enhance with Gemini AI insights
     if use_gemini:
         try:
             gemini_insights = await analyze_with_gemini(analysis)
+            if gemini_insights is not None:
+                # Model output is the one untrusted part of the response
+                gemini_insights = GeminiInsights.model_validate(gemini_insights).model_dump(mode="json")
             analysis["gemini_insights"] = gemini_insights
             logger.info(f"Gemini insights added for dataset {dataset_id}")
         except Exception as e:
             logger.warning(f"Gemini analysis failed for {dataset_id}: {e}")
             # Keep gemini_insights as None, don't fail the request
 
-    return analysis
+    # quick_analyze_dataframe builds every other field in the shape of
+    # QuickAnalysisResponse, so it is encoded as-is instead of re-validated
+    return ORJSONResponse(analysis)
 
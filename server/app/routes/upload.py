@@ -1,13 +1,41 @@
-from io import StringIO
+import os
 
 import pandas as pd
 from fastapi import APIRouter, File, Form, HTTPException, UploadFile
+from fastapi.concurrency import run_in_threadpool
 
 from app.services.dataframe_store import project_exists, save_dataframe
+from app.services.dataset_loader import read_csv
 
 router = APIRouter()
 
 
+def _parse_and_store(project_id: str, file: UploadFile) -> str:
+    """Parse an uploaded CSV and store it; returns the dataset_id (blocking)."""
+    # Parse straight from the spooled upload, with the same result as pd.read_csv
+    try:
+        if not file.file.seek(0, os.SEEK_END):
+            raise HTTPException(status_code=400, detail="Empty file uploaded.")
+        file.file.seek(0)
+        df = read_csv(file.file)
+        
+        if df.empty:
+            raise HTTPException(status_code=400, detail="CSV file contains no data.")
+        
+    except UnicodeDecodeError:
+        raise HTTPException(status_code=400, detail="File encoding error. Please use UTF-8.")
+    except pd.errors.EmptyDataError:
+        raise HTTPException(status_code=400, detail="CSV file is empty or malformed.")
+    except pd.errors.ParserError:
+        raise HTTPException(status_code=400, detail="Failed to parse CSV file.")
+
+    # Store DataFrame
+    try:
+        return save_dataframe(project_id, df)
+    except OSError as e:
+        raise HTTPException(status_code=507, detail=f"Failed to store dataset: {e.strerror or e}")
+
+
 @router.post("/upload")
 async def upload_csv(
     project_id: str = Form(...),
@@ -31,28 +59,8 @@ async def upload_csv(
             detail="Invalid file type. Only CSV files are accepted."
         )
 
-    # Read file content
-    try:
-        contents = await file.read()
-        if not contents:
-            raise HTTPException(status_code=400, detail="Empty file uploaded.")
-        
-        # Decode and parse CSV
-        decoded = contents.decode("utf-8")
-        df = pd.read_csv(StringIO(decoded))
-        
-        if df.empty:
-            raise HTTPException(status_code=400, detail="CSV file contains no data.")
-        
-    except UnicodeDecodeError:
-        raise HTTPException(status_code=400, detail="File encoding error. Please use UTF-8.")
-    except pd.errors.EmptyDataError:
-        raise HTTPException(status_code=400, detail="CSV file is empty or malformed.")
-    except pd.errors.ParserError:
-        raise HTTPException(status_code=400, detail="Failed to parse CSV file.")
-
-    # Store DataFrame and return IDs
-    dataset_id = save_dataframe(project_id, df)
+    # Parsing and storing block, so keep them off the event loop
+    dataset_id = await run_in_threadpool(_parse_and_store, project_id, file)
     
     return {
         "project_id": project_id,
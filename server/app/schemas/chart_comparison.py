@@ -0,0 +1,35 @@
+"""Chart Comparison Pydantic Schemas."""
+
+from typing import Optional
+
+from pydantic import BaseModel
+
+
+class ChartConfig(BaseModel):
+    """Chart configuration for comparison."""
+    type: str
+    props: dict
+
+
+class CompareRequest(BaseModel):
+    """Request body for chart comparison."""
+    chart1: ChartConfig
+    chart2: ChartConfig
+    datasetId: Optional[str] = None
+
+
+class ComparisonInsight(BaseModel):
+    """A single comparison insight."""
+    comparison_title: str
+    relationship_type: str
+    key_insights: list[str]
+    statistical_notes: str
+    recommendation: str
+    visualization_suggestion: Optional[dict] = None
+
+
+class CompareResponse(BaseModel):
+    """Response from chart comparison."""
+    success: bool
+    comparison: ComparisonInsight
+    charts: dict
@@ -40,6 +40,18 @@ class ChatMessageResponse(ChatMessageBase):
         from_attributes = True
 
 
+class ChatMessageCursor(BaseModel):
+    """Keyset cursor: the (created_at, id) of the last message returned."""
+    after_ts: datetime
+    after_id: int
+
+
+class ChatMessagePage(BaseModel):
+    """One page of a chat's messages; next is None on the last page."""
+    messages: list[ChatMessageResponse]
+    next: Optional[ChatMessageCursor] = None
+
+
 class ChatListItem(BaseModel):
     """Represents a complete chat (all messages for a chat_id)."""
     id: str  # chat_id
@@ -1,16 +1,25 @@
 """Chart Comparison Service - Compare two chart visualizations using Gemini."""
 
+import hashlib
 import os
-import json
 import logging
 from typing import Optional, Any
 
 import google.generativeai as genai
+import orjson
+from cachetools import LRUCache
+
+from app.schemas.chart_comparison import ChartConfig
+from app.services.gemini_quota import gemini_slots
 
 logger = logging.getLogger(__name__)
 
 GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
 
+# sha256 of the comparison context -> parsed Gemini result. Dashboards redraw
+# the same chart pairs, and the prompt is fully determined by the context.
+_result_cache: LRUCache = LRUCache(maxsize=512)
+
 # Reuse model configuration
 _model = None
 
@@ -34,8 +43,8 @@ def _get_model():
 
 
 async def compare_charts(
-    chart1: dict,
-    chart2: dict,
+    chart1: ChartConfig,
+    chart2: ChartConfig,
     dataset_profile: Optional[dict] = None
 ) -> dict:
     """
@@ -58,16 +67,21 @@ async def compare_charts(
         # Fallback: return basic comparison without Gemini
         return _generate_basic_comparison(chart1, chart2)
     
+    cache_key = hashlib.sha256(orjson.dumps(context, option=orjson.OPT_SORT_KEYS)).hexdigest()
+    result = _result_cache.get(cache_key)
+    if result is not None:
+        return _comparison_response(result, chart1, chart2)
+
     try:
         prompt = f"""You are an expert data analyst. Analyze these two chart configurations and provide comparison insights.
 
 Chart 1:
-{json.dumps(context['chart1'], indent=2)}
+{_pretty_json(context['chart1'])}
 
 Chart 2:
-{json.dumps(context['chart2'], indent=2)}
+{_pretty_json(context['chart2'])}
 
-{f"Dataset Profile: {json.dumps(context['profile'], indent=2)}" if context.get('profile') else ""}
+{f"Dataset Profile: {_pretty_json(context['profile'])}" if context.get('profile') else ""}
 
 Provide a JSON response with:
 {{
@@ -87,20 +101,16 @@ Provide a JSON response with:
 
 Be concise and specific. Focus on actionable insights."""
 
-        response = model.generate_content(prompt)
-        result = json.loads(response.text)
+        # The async client awaits the round-trip instead of blocking the event loop
+        async with gemini_slots:
+            response = await model.generate_content_async(prompt)
+        result = orjson.loads(response.text)
+        _result_cache[cache_key] = result
         
         logger.info("Chart comparison completed successfully")
-        return {
-            "success": True,
-            "comparison": result,
-            "charts": {
-                "chart1": chart1,
-                "chart2": chart2
-            }
-        }
+        return _comparison_response(result, chart1, chart2)
         
-    except json.JSONDecodeError as e:
+    except orjson.JSONDecodeError as e:
         logger.error(f"Failed to parse Gemini response: {e}")
         return _generate_basic_comparison(chart1, chart2)
     except Exception as e:
@@ -108,11 +118,28 @@ Be concise and specific. Focus on actionable insights."""
         return _generate_basic_comparison(chart1, chart2)
 
 
-def _build_comparison_context(chart1: dict, chart2: dict, profile: Optional[dict]) -> dict:
+def _pretty_json(value: Any) -> str:
+    """Indented JSON for embedding in a prompt."""
+    return orjson.dumps(value, option=orjson.OPT_INDENT_2).decode()
+
+
+def _comparison_response(result: dict, chart1: ChartConfig, chart2: ChartConfig) -> dict:
+    """Wrap a Gemini comparison result in the endpoint response shape."""
+    return {
+        "success": True,
+        "comparison": result,
+        "charts": {
+            "chart1": chart1,
+            "chart2": chart2
+        }
+    }
+
+
+def _build_comparison_context(chart1: ChartConfig, chart2: ChartConfig, profile: Optional[dict]) -> dict:
     """Build context for comparison prompt."""
-    def extract_chart_info(chart: dict) -> dict:
-        chart_type = chart.get("type", "unknown")
-        props = chart.get("props", {})
+    def extract_chart_info(chart: ChartConfig) -> dict:
+        chart_type = chart.type
+        props = chart.props
         
         info = {
             "type": chart_type,
@@ -151,13 +178,13 @@ def _build_comparison_context(chart1: dict, chart2: dict, profile: Optional[dict
     return context
 
 
-def _generate_basic_comparison(chart1: dict, chart2: dict) -> dict:
+def _generate_basic_comparison(chart1: ChartConfig, chart2: ChartConfig) -> dict:
     """Generate basic comparison without Gemini."""
-    type1 = chart1.get("type", "chart")
-    type2 = chart2.get("type", "chart")
+    type1 = chart1.type
+    type2 = chart2.type
     
-    col1 = chart1.get("props", {}).get("column", "data")
-    col2 = chart2.get("props", {}).get("column", "data")
+    col1 = chart1.props.get("column", "data")
+    col2 = chart2.props.get("column", "data")
     
     return {
         "success": True,
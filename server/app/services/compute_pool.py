@@ -0,0 +1,130 @@
+"""
+Process pool for CPU-bound dataset work.
+
+pandas/numpy hold the GIL for much of profiling and chart aggregation, so
+running them in worker processes lets concurrent requests use every core.
+Workers receive the dataset file path instead of a pickled DataFrame and
+read it through read_dataset_view, whose frame cache lives in each worker,
+so repeat requests skip CSV parsing.
+"""
+import asyncio
+import logging
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Callable, Optional, Sequence
+
+from app.services.dataset_loader import DATASET_CACHE_BYTES, read_dataset_view, set_frame_cache_bytes
+
+logger = logging.getLogger(__name__)
+
+
+def _available_cpus() -> int:
+    """CPUs this process may run on; os.cpu_count() counts the whole host."""
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:
+        # No affinity API on macOS/Windows
+        return os.cpu_count() or 1
+
+
+# Every worker imports pandas, pyarrow and numba and keeps its own frame
+# cache, so the default stays small enough for a 512 MB instance. The
+# frame-cache budget, DATASET_CACHE_BYTES, is split between the workers.
+COMPUTE_WORKERS = int(os.getenv("COMPUTE_WORKERS") or min(2, _available_cpus()))
+# Workers are only spawned ahead of the first request when sized explicitly
+WARM_WORKERS = bool(os.getenv("COMPUTE_WORKERS"))
+
+_executor: Optional[ProcessPoolExecutor] = None
+
+
+def get_executor() -> ProcessPoolExecutor:
+    """Create the process pool on first use."""
+    global _executor
+    if _executor is None:
+        # spawn, not fork: forked children would inherit the parent's DB pool
+        # and threads
+        _executor = ProcessPoolExecutor(
+            max_workers=COMPUTE_WORKERS,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=set_frame_cache_bytes,
+            initargs=(DATASET_CACHE_BYTES // COMPUTE_WORKERS,),
+        )
+    return _executor
+
+
+def _warm_up() -> None:
+    """No-op task; unpickling it imports this module (pandas, pyarrow, the visualizers) in the worker."""
+
+
+def start_executor() -> None:
+    """
+    Create the pool at app startup and have every worker spawn and import
+    its modules in the background, so the first chart requests don't pay
+    for process start-up. Only done when COMPUTE_WORKERS is set; otherwise
+    workers start on demand.
+    """
+    if not WARM_WORKERS:
+        return
+    executor = get_executor()
+    for _ in range(COMPUTE_WORKERS):
+        executor.submit(_warm_up)
+
+
+def _discard_executor(executor: ProcessPoolExecutor) -> None:
+    """Drop a broken pool so the next get_executor() starts a fresh one."""
+    global _executor
+    # Concurrent requests on the broken pool all land here; only the first
+    # clears it, so a replacement another request started survives
+    if _executor is executor:
+        _executor = None
+    executor.shutdown(wait=False, cancel_futures=True)
+
+
+def shutdown_executor() -> None:
+    """Stop worker processes (called on app shutdown)."""
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait=False, cancel_futures=True)
+        _executor = None
+
+
+def _run_on_dataset(
+    func: Callable[..., Any],
+    file_path: str,
+    args: tuple,
+    columns: Optional[Sequence[str]],
+    row_filter: Optional[tuple],
+) -> Any:
+    """Worker entry point: load the (filtered) frame and apply func to it."""
+    return func(read_dataset_view(file_path, columns, row_filter), *args)
+
+
+async def run_on_dataset(
+    func: Callable[..., Any],
+    file_path: str,
+    *args: Any,
+    columns: Optional[Sequence[str]] = None,
+    row_filter: Optional[tuple] = None,
+) -> Any:
+    """
+    Run func(df, *args) in the process pool for the dataset at file_path.
+    columns/row_filter are forwarded to read_dataset_view, so func receives
+    the already-filtered rows. func must be a module-level function so it
+    can be pickled.
+    """
+    loop = asyncio.get_running_loop()
+    executor = get_executor()
+    try:
+        return await loop.run_in_executor(
+            executor, _run_on_dataset, func, file_path, args, columns, row_filter
+        )
+    except BrokenProcessPool as e:
+        # A worker died (e.g. OOM-killed), which breaks the whole pool;
+        # retry once on a new one instead of failing every later request
+        logger.warning(f"Compute pool broken, restarting it: {e}")
+        _discard_executor(executor)
+        return await loop.run_in_executor(
+            get_executor(), _run_on_dataset, func, file_path, args, columns, row_filter
+        )
@@ -1,40 +1,154 @@
+"""
+Uploaded DataFrames, shared by every worker process.
+
+Each frame is written once as an Arrow IPC file under DATAFRAME_STORE_DIR
+(on disk in the system temp directory by default) and memory-mapped by
+whichever worker reads it; the page cache keeps hot files in memory. Once
+the files exceed DATAFRAME_STORE_BYTES the oldest are deleted. Each process
+also keeps its recently used frames in a small LRU, so repeat reads skip the
+Arrow -> pandas conversion.
+
+Cached frames are shared by every caller: their arrays are read-only, and
+callers get a shallow copy, so adding or replacing columns is fine but
+editing values in place needs an explicit df.copy() first.
+"""
+import os
+import tempfile
+import threading
+from pathlib import Path
+
+import numpy as np
 import pandas as pd
+import pyarrow as pa
+from cachetools import LRUCache
+
+from app.services.id_generator import BASE62_CHARS, generate_short_id
+
+DATAFRAME_STORE_DIR = Path(
+    os.getenv("DATAFRAME_STORE_DIR") or os.path.join(tempfile.gettempdir(), "dambo")
+)
+DATAFRAME_STORE_BYTES = int(os.getenv("DATAFRAME_STORE_BYTES") or "1000000000")
+DATAFRAME_CACHE_SIZE = int(os.getenv("DATAFRAME_CACHE_SIZE") or "16")
+
+# (project_id, dataset_id) -> DataFrame
+_frames: LRUCache = LRUCache(maxsize=DATAFRAME_CACHE_SIZE)
+_frames_lock = threading.Lock()
+
+MAX_ID_ATTEMPTS = 100
+
+
+def _is_store_id(value: str) -> bool:
+    """IDs become path components, so only generated base62 IDs are accepted."""
+    return bool(value) and all(c in BASE62_CHARS for c in value)
 
-from app.services.id_generator import generate_unique_id
 
-# In-memory storage: { project_id: { dataset_id: DataFrame } }
-_projects: dict[str, dict[str, pd.DataFrame]] = {}
+def _cache_frame(key: tuple[str, str], df: pd.DataFrame) -> None:
+    """Mark a frame's arrays read-only and cache it."""
+    for block in df._mgr.blocks:
+        if isinstance(block.values, np.ndarray):
+            block.values.setflags(write=False)
+    with _frames_lock:
+        _frames[key] = df
+
+
+def _dataset_path(project_id: str, dataset_id: str) -> Path:
+    return DATAFRAME_STORE_DIR / project_id / f"{dataset_id}.arrow"
+
+
+def _evict_stored_frames(keep: Path) -> None:
+    """
+    Delete the oldest stored frames, never keep, until the store fits in
+    DATAFRAME_STORE_BYTES. Workers may evict concurrently, so files can
+    vanish mid-scan. Readers that already mapped a deleted file keep it.
+    """
+    files = []
+    for path in DATAFRAME_STORE_DIR.glob("*/*.arrow"):
+        try:
+            stat = path.stat()
+        except FileNotFoundError:
+            continue
+        files.append((stat.st_mtime_ns, stat.st_size, path))
+    total = sum(size for _, size, _ in files)
+    for _, size, path in sorted(files):
+        if total <= DATAFRAME_STORE_BYTES:
+            break
+        if path == keep:
+            continue
+        path.unlink(missing_ok=True)
+        total -= size
+        with _frames_lock:
+            _frames.pop((path.parent.name, path.stem), None)
 
 
 def create_project() -> str:
     """Create a new project and return its unique 6-char ID."""
-    project_id = generate_unique_id(set(_projects.keys()))
-    _projects[project_id] = {}
-    return project_id
+    DATAFRAME_STORE_DIR.mkdir(parents=True, exist_ok=True)
+    for _ in range(MAX_ID_ATTEMPTS):
+        project_id = generate_short_id()
+        try:
+            # mkdir is atomic, so two workers can never claim the same ID
+            (DATAFRAME_STORE_DIR / project_id).mkdir()
+            return project_id
+        except FileExistsError:
+            continue
+    raise RuntimeError("Failed to generate unique ID after max attempts")
 
 
 def project_exists(project_id: str) -> bool:
     """Check if a project exists."""
-    return project_id in _projects
+    return _is_store_id(project_id) and (DATAFRAME_STORE_DIR / project_id).is_dir()
 
 
 def save_dataframe(project_id: str, df: pd.DataFrame) -> str:
-    """Save a DataFrame under a project and return its unique 6-char dataset_id."""
+    """
+    Save a DataFrame under a project and return its unique 6-char dataset_id.
+    Raises OSError when the store's filesystem is full or unwritable.
+    """
     if not project_exists(project_id):
         raise KeyError(f"Project not found: {project_id}")
-    
-    existing_dataset_ids = set(_projects[project_id].keys())
-    dataset_id = generate_unique_id(existing_dataset_ids)
-    _projects[project_id][dataset_id] = df
-    return dataset_id
+
+    table = pa.Table.from_pandas(df)
+    fd, tmp_path = tempfile.mkstemp(dir=DATAFRAME_STORE_DIR / project_id, suffix=".tmp")
+    os.close(fd)
+    try:
+        with pa.OSFile(tmp_path, "wb") as sink, pa.ipc.new_file(sink, table.schema) as writer:
+            writer.write_table(table)
+        for _ in range(MAX_ID_ATTEMPTS):
+            dataset_id = generate_short_id()
+            try:
+                # Publishing through a hard link is atomic and fails if the ID
+                # is taken, so readers never see a partial file and concurrent
+                # uploads in other workers can't claim the same ID
+                os.link(tmp_path, _dataset_path(project_id, dataset_id))
+            except FileExistsError:
+                continue
+            _cache_frame((project_id, dataset_id), df)
+            _evict_stored_frames(keep=_dataset_path(project_id, dataset_id))
+            return dataset_id
+        raise RuntimeError("Failed to generate unique ID after max attempts")
+    finally:
+        os.unlink(tmp_path)
 
 
 def get_dataframe(project_id: str, dataset_id: str) -> pd.DataFrame:
-    """Retrieve a DataFrame by project_id and dataset_id."""
+    """
+    Retrieve a DataFrame by project_id and dataset_id, as a shallow copy
+    sharing the cached frame's read-only arrays.
+    """
+    key = (project_id, dataset_id)
+    with _frames_lock:
+        df = _frames.get(key)
+    if df is not None:
+        return df.copy(deep=False)
+
     if not project_exists(project_id):
         raise KeyError(f"Project not found: {project_id}")
-    
-    if dataset_id not in _projects[project_id]:
+
+    path = _dataset_path(project_id, dataset_id)
+    if not _is_store_id(dataset_id) or not path.is_file():
         raise KeyError(f"Dataset not found: {dataset_id}")
-    
-    return _projects[project_id][dataset_id]
+
+    with pa.memory_map(str(path)) as source:
+        df = pa.ipc.open_file(source).read_all().to_pandas()
+    _cache_frame(key, df)
+    return df.copy(deep=False)
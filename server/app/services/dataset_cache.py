@@ -0,0 +1,111 @@
+"""
+In-process caches for derived dataset data.
+
+Uploaded datasets are immutable, so anything computed from one can be
+reused until the dataset is replaced or the entry expires.
+"""
+import os
+import threading
+from typing import Any, Callable, Optional, Sequence, Union
+
+import orjson
+from cachetools import TTLCache
+from cachetools.keys import hashkey
+from sqlalchemy import JSON, Text, cast, func, literal, select
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import Session
+
+from app.db.models.dataset_profile_cache import DatasetProfileCache
+from app.services.compute_pool import run_on_dataset
+from app.services.dataset_loader import evict_dataset_file, evict_dataset_path
+from app.services.dataset_profiler import profile_dataframe
+
+_profile_cache: TTLCache = TTLCache(maxsize=128, ttl=600)
+_profile_lock = threading.Lock()
+
+# Encoded chart responses keyed by (file path, chart function, arguments,
+# columns, row filter), bounded by total JSON size. Dashboards re-request
+# the same charts, often with the same filter, on every render.
+CHART_CACHE_BYTES = int(os.getenv("CHART_CACHE_BYTES") or "100000000")
+
+_chart_cache: TTLCache = TTLCache(maxsize=CHART_CACHE_BYTES, ttl=600, getsizeof=len)
+_chart_lock = threading.Lock()
+
+
+async def get_cached_profile(dataset_id: str, file_path: str) -> dict:
+    """Profile a dataset in the compute pool, reusing the result for repeat calls."""
+    key = hashkey(dataset_id)
+    with _profile_lock:
+        profile = _profile_cache.get(key)
+    if profile is None:
+        profile = await run_on_dataset(profile_dataframe, file_path)
+        with _profile_lock:
+            _profile_cache[key] = profile
+    return profile
+
+
+def _hashable(value: Any) -> Any:
+    """Lists (column names) as tuples, so they can be part of a cache key."""
+    return tuple(value) if isinstance(value, list) else value
+
+
+async def get_cached_chart(
+    func: Callable[..., Any],
+    file_path: str,
+    *args: Any,
+    columns: Optional[Union[Sequence[str], str]] = None,
+    row_filter: Optional[tuple] = None,
+) -> bytes:
+    """
+    run_on_dataset(func, file_path, *args, ...) encoded as the JSON body
+    ORJSONResponse would send, reusing it for repeat requests.
+    """
+    key = hashkey(
+        file_path, func.__name__, *map(_hashable, args),
+        columns=_hashable(columns), row_filter=row_filter,
+    )
+    with _chart_lock:
+        body = _chart_cache.get(key)
+    if body is None:
+        result = await run_on_dataset(func, file_path, *args, columns=columns, row_filter=row_filter)
+        body = orjson.dumps(result, option=orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY)
+        with _chart_lock:
+            try:
+                _chart_cache[key] = body
+            except ValueError:
+                pass  # Larger than the whole cache; serve it uncached
+    return body
+
+
+def invalidate_dataset(dataset_id: str, file_path: Optional[str] = None) -> None:
+    """Drop cached entries for a dataset."""
+    with _profile_lock:
+        _profile_cache.pop(hashkey(dataset_id), None)
+    evict_dataset_path(dataset_id)
+    if file_path:
+        with _chart_lock:
+            for key in [k for k in _chart_cache if k[0] == file_path]:
+                _chart_cache.pop(key, None)
+        evict_dataset_file(file_path)
+
+
+def get_stored_profile_json(db: Session, dataset_id: str) -> Optional[str]:
+    """Return the persisted profile JSON text, exactly as stored, if any."""
+    return db.execute(
+        select(cast(DatasetProfileCache.payload, Text))
+        .where(DatasetProfileCache.dataset_id == dataset_id)
+    ).scalar_one_or_none()
+
+
+def store_profile_json(db: Session, dataset_id: str, payload_json: str) -> None:
+    """Upsert the persisted profile for a dataset."""
+    stmt = insert(DatasetProfileCache).values(
+        dataset_id=dataset_id,
+        payload=cast(literal(payload_json, Text), JSON),
+    )
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[DatasetProfileCache.dataset_id],
+        set_={"payload": stmt.excluded.payload, "computed_at": func.timezone("utc", func.now())},
+    )
+    db.execute(stmt)
+    db.commit()
@@ -1,39 +1,473 @@
+import os
+import threading
+from functools import lru_cache
+from io import BytesIO
 from pathlib import Path
+from typing import BinaryIO, Optional, Sequence, Union
+from urllib.request import urlopen
 
+import numpy as np
 import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.csv as pacsv
+import pyarrow.parquet as pq
+from cachetools import LFUCache, TTLCache, cached
+from cachetools.keys import hashkey
+from sqlalchemy import func, select
 from sqlalchemy.orm import Session
 
 from app.db.models.dataset import Dataset
+from app.services.dataset_visualizer import filter_mask, take_rows
 
+# Parsed data as (version, DataFrame) keyed by file path, plus single
+# (version, Series) columns of local Parquet copies keyed by (path, column).
+# Bounded by memory rather than entry count; local entries are revalidated
+# against the file's (mtime, size) so a file replaced in place is re-read.
+# DATASET_CACHE_BYTES is the total across compute workers, which each get
+# an equal share through set_frame_cache_bytes.
+DATASET_CACHE_BYTES = int(os.getenv("DATASET_CACHE_BYTES") or "500000000")
 
-def load_dataset(db: Session, dataset_id: str) -> pd.DataFrame:
+
+def _entry_size(entry: tuple) -> int:
+    return int(np.sum(entry[1].memory_usage(deep=True)))
+
+
+_frame_cache: LFUCache = LFUCache(maxsize=DATASET_CACHE_BYTES, getsizeof=_entry_size)
+_frame_lock = threading.Lock()
+
+
+def set_frame_cache_bytes(maxsize: int) -> None:
+    """Bound this process's frame cache to maxsize bytes, dropping its entries."""
+    global _frame_cache
+    with _frame_lock:
+        _frame_cache = LFUCache(maxsize=maxsize, getsizeof=_entry_size)
+
+# dataset_id -> (path to read, column schema). Rows are never updated after
+# upload, so the TTL only bounds how long another worker process can serve a
+# removed dataset.
+_path_cache: TTLCache = TTLCache(maxsize=1024, ttl=300)
+_path_lock = threading.Lock()
+
+
+@cached(cache=_path_cache, key=lambda db, dataset_id: hashkey(dataset_id), lock=_path_lock)
+def _lookup_dataset(db: Session, dataset_id: str) -> tuple[str, Optional[dict[str, str]]]:
     """
-    Load a dataset from disk given its dataset_id.
-    Fetches metadata from DB and reads CSV from file_path.
+    Look up the path to read a dataset from, preferring its Parquet copy, and
+    its column schema. Selects columns only, so no Dataset object is hydrated;
+    only found datasets are cached, so a miss always goes to the database.
+    Rows whose upload has not finished (empty file_path) count as not found.
     """
-    # Fetch dataset record from database
-    dataset = db.query(Dataset).filter(Dataset.dataset_id == dataset_id).first()
-    if not dataset:
+    row = db.execute(
+        select(func.coalesce(Dataset.parquet_path, Dataset.file_path), Dataset.column_schema)
+        .where(Dataset.dataset_id == dataset_id, Dataset.file_path != "")
+    ).one_or_none()
+    if row is None:
         raise ValueError(f"Dataset not found: {dataset_id}")
+    return row[0], row[1]
+
+
+def get_dataset_file_path(db: Session, dataset_id: str) -> str:
+    """Path to read a dataset from (cached)."""
+    return _lookup_dataset(db, dataset_id)[0]
+
+
+def get_dataset_schema(db: Session, dataset_id: str) -> Optional[dict[str, str]]:
+    """Column name -> dtype recorded at upload (cached); None for datasets uploaded before schemas were stored."""
+    return _lookup_dataset(db, dataset_id)[1]
+
+
+def frame_schema(df: pd.DataFrame) -> dict[str, str]:
+    """Column name -> pandas dtype name, as stored in Dataset.column_schema."""
+    return {str(col): str(dtype) for col, dtype in df.dtypes.items()}
+
+
+# Row groups carry min/max statistics, letting readers skip groups that
+# cannot match; ZSTD level 1 compresses close to gzip at near-snappy speed.
+PARQUET_ROW_GROUP_SIZE = 128_000
+
+
+def csv_to_parquet(content: Union[bytes, BinaryIO]) -> tuple[bytes, dict[str, str]]:
+    """
+    Convert an uploaded CSV (bytes or file object) to Parquet, keeping the
+    dtypes read_csv infers. Returns the Parquet bytes and the frame's schema.
+    """
+    df = read_csv(content)
+    return df.to_parquet(
+        index=False,
+        engine="pyarrow",
+        compression="zstd",
+        compression_level=1,
+        row_group_size=PARQUET_ROW_GROUP_SIZE,
+        write_statistics=True,
+    ), frame_schema(df)
+
+
+def _read_parquet(path, columns: Optional[list[str]] = None) -> pd.DataFrame:
+    """Read a Parquet copy into the same numpy-backed frame read_csv would build."""
+    df = pd.read_parquet(path, columns=columns)
+    # Parquet restores missing strings as None; read_csv yields NaN
+    object_cols = df.columns[df.dtypes == object]
+    if len(object_cols):
+        df[object_cols] = df[object_cols].fillna(np.nan)
+    return df
+
+
+# Arrow conversion settings mirroring pd.read_csv's defaults: the same
+# missing-value markers (which also apply to string columns) and the same
+# boolean spellings
+_CSV_CONVERT_ARGS = dict(
+    null_values=[
+        "", "#N/A", "#N/A N/A", "#NA", "-1.#IND", "-1.#QNAN", "-NaN", "-nan", "1.#IND",
+        "1.#QNAN", "<NA>", "N/A", "NA", "NULL", "NaN", "None", "n/a", "nan", "null",
+    ],
+    strings_can_be_null=True,
+    true_values=["True", "TRUE", "true"],
+    false_values=["False", "FALSE", "false"],
+)
+_CSV_READ_OPTIONS = pacsv.ReadOptions(use_threads=True, block_size=1 << 20)
+
+
+def _parse_arrow_csv(stream) -> Optional[pa.Table]:
+    """Arrow's multithreaded CSV parse of a stream, or None if Arrow rejects it."""
+    try:
+        return pacsv.read_csv(
+            stream,
+            read_options=_CSV_READ_OPTIONS,
+            convert_options=pacsv.ConvertOptions(**_CSV_CONVERT_ARGS),
+        )
+    except pa.ArrowInvalid:
+        return None
+
+
+def _arrow_csv_frame(raw: bytes, table: Optional[pa.Table] = None) -> Optional[pd.DataFrame]:
+    """
+    Parse a CSV with Arrow's multithreaded reader into the numpy-backed frame
+    read_csv would build, or None where the two disagree (hex or signed
+    integers, integers past int64, duplicate or blank headers,
+    ragged or whitespace-only rows, unterminated quotes) and read_csv has to
+    parse it.
+    `table` is raw already parsed by _parse_arrow_csv, if it has been.
+    """
+    if b"0x" in raw or b"0X" in raw:
+        # Arrow reads hex integers; read_csv keeps them as text
+        return None
+    if raw.count(b'"') % 2:
+        # Arrow takes a quoted field left open at EOF as running to the end;
+        # read_csv rejects it. Quoted fields and their doubled escapes pair
+        # up, so an odd count means one is open (or a bare quote inside an
+        # unquoted field, which read_csv then parses just as well)
+        return None
+    if table is None:
+        table = _parse_arrow_csv(pa.BufferReader(raw))
+        if table is None:
+            return None
+    names = table.column_names
+    if not table.num_rows or not all(names) or len(set(names)) < len(names):
+        return None
+    text_cols = [field.name for field in table.schema if pa.types.is_temporal(field.type)]
+    if text_cols:
+        # read_csv leaves dates and times as text; re-convert just those columns as strings
+        as_text = pacsv.read_csv(
+            pa.BufferReader(raw),
+            read_options=_CSV_READ_OPTIONS,
+            convert_options=pacsv.ConvertOptions(
+                **_CSV_CONVERT_ARGS,
+                include_columns=text_cols,
+                column_types=dict.fromkeys(text_cols, pa.string()),
+            ),
+        )
+        for name in text_cols:
+            table = table.set_column(table.schema.get_field_index(name), name, as_text.column(name))
+    for i, field in enumerate(table.schema):
+        if pa.types.is_null(field.type):
+            # All-missing column; read_csv makes it float64 NaN
+            table = table.set_column(i, field.name, table.column(i).cast(pa.float64()))
+        elif not (
+            pa.types.is_integer(field.type) or pa.types.is_floating(field.type)
+            or pa.types.is_boolean(field.type) or pa.types.is_string(field.type)
+        ):
+            return None
+    if (
+        table.num_columns == 1 and pa.types.is_string(table.schema[0].type)
+        and pc.any(pc.utf8_is_space(table.column(0))).as_py()
+    ):
+        # read_csv skips whitespace-only lines as blank; with one column they parse as values here
+        return None
+
+    df = table.to_pandas()
+    floats = df.select_dtypes("float").to_numpy()
+    if (np.abs(floats) >= 2.0 ** 63).any():
+        # Integers past int64 parse as lossy floats here; read_csv keeps them exact
+        return None
+    if b"+" in raw and (np.isfinite(floats) & (floats == np.round(floats))).all(axis=0).any():
+        # "+5" is a float to Arrow but an int to read_csv, which only shows
+        # in a column holding nothing but whole numbers
+        return None
+    # Arrow restores missing strings/booleans as None; read_csv yields NaN.
+    # Arrow's validity bitmaps already say where, so no isna() scan is needed.
+    for name in df.columns[df.dtypes == object]:
+        column = table.column(name)
+        if column.null_count:
+            values = df[name].to_numpy(copy=True)
+            values[column.is_null().to_numpy()] = np.nan
+            df[name] = values
+    return df
+
+
+class _RecordingReader:
+    """Read-only file object that keeps a copy of every byte read through it."""
+
+    closed = False
+
+    def __init__(self, stream: BinaryIO):
+        self._stream = stream
+        self.data = bytearray()
+
+    def read(self, size: int = -1) -> bytes:
+        # Arrow streams take no negative size for "read to the end"
+        chunk = self._stream.read() if size < 0 else self._stream.read(size)
+        self.data += chunk
+        return chunk
+
+
+def _fetch_and_parse_csv(url: str) -> tuple[bytes, Optional[pa.Table]]:
+    """
+    Download a remote CSV (zstd-compressed for a .zst URL) while Arrow
+    parses it, so parsing overlaps the transfer instead of waiting for the
+    last byte. Returns the raw bytes (needed for the read_csv fallback) and
+    the table, or None if Arrow rejected it.
+    """
+    with urlopen(url) as response:
+        stream = response
+        if url.endswith(".zst"):
+            stream = pa.CompressedInputStream(pa.PythonFile(response, mode="r"), "zstd")
+        recorder = _RecordingReader(stream)
+        table = _parse_arrow_csv(pa.PythonFile(recorder, mode="r"))
+        # Arrow stops early on a parse error; the fallback needs the rest
+        recorder.read()
+    return bytes(recorder.data), table
+
+
+def read_csv(source: Union[str, Path, bytes, BinaryIO]) -> pd.DataFrame:
+    """pd.read_csv with the same result, parsed by Arrow whenever it can be."""
+    table = None
+    if isinstance(source, bytes):
+        raw = source
+    elif hasattr(source, "read"):
+        raw = source.read()
+    elif _is_url(str(source)):
+        raw, table = _fetch_and_parse_csv(str(source))
+        if table is None:
+            return pd.read_csv(BytesIO(raw))
+    elif str(source).endswith(".zst"):
+        with pa.input_stream(str(source), compression="zstd") as f:
+            raw = f.read()
+    else:
+        raw = Path(source).read_bytes()
+
+    df = _arrow_csv_frame(raw, table)
+    return df if df is not None else pd.read_csv(BytesIO(raw))
+
+
+def _is_url(file_path_str: str) -> bool:
+    return file_path_str.startswith("http://") or file_path_str.startswith("https://")
+
+
+def _file_version(file_path_str: str) -> Optional[tuple[int, int]]:
+    """
+    (mtime_ns, size) of a local dataset file; None for URLs (uploads there
+    are immutable) or missing files. The size catches a rewrite that lands
+    within the filesystem's mtime granularity.
+    """
+    if _is_url(file_path_str):
+        return None
+    try:
+        stat = os.stat(file_path_str)
+    except OSError:
+        return None
+    return stat.st_mtime_ns, stat.st_size
+
+
+def read_dataset(file_path_str: str) -> pd.DataFrame:
+    """
+    Read a dataset (CSV or its Parquet copy) from a Cloudinary URL or local path.
+    Frames are cached and shared between callers, so treat them as read-only.
+    """
+    version = _file_version(file_path_str)
+    with _frame_lock:
+        entry = _frame_cache.get(file_path_str)
+    if entry is not None and entry[0] == version:
+        return entry[1]
+
+    df = _read_dataset_file(file_path_str)
+    with _frame_lock:
+        try:
+            _frame_cache[file_path_str] = (version, df)
+        except ValueError:
+            pass  # Larger than the whole cache; serve it uncached
+    return df
+
+
+def _read_dataset_file(file_path_str: str) -> pd.DataFrame:
+    """Parse a dataset file without consulting the cache."""
+    reader = _read_parquet if file_path_str.endswith(".parquet") else read_csv
 
     # Check if file exists (only for local files)
-    file_path_str = dataset.file_path
-    if file_path_str.startswith("http://") or file_path_str.startswith("https://"):
+    if _is_url(file_path_str):
         # Cloudinary URL - read directly
         try:
-            df = pd.read_csv(file_path_str)
+            df = reader(file_path_str)
             return df
         except Exception as e:
             raise RuntimeError(f"Failed to read dataset from URL: {e}")
-    
+
     # Local file path
     file_path = Path(file_path_str)
     if not file_path.exists():
         raise FileNotFoundError(f"Dataset file not found: {file_path}")
 
-    # Read CSV from local disk
+    # Read from local disk
     try:
-        df = pd.read_csv(file_path)
+        df = reader(file_path)
         return df
     except Exception as e:
         raise RuntimeError(f"Failed to read dataset file: {e}")
+
+
+# Pass as `columns` to read every numeric column (e.g. for correlation)
+NUMERIC_COLUMNS = "numeric"
+
+
+@lru_cache(maxsize=256)
+def _parquet_layout(file_path_str: str, version: tuple[int, int]) -> tuple[list[str], list[str], int]:
+    """(column names, numeric column names, row count) from a Parquet footer."""
+    metadata = pq.read_metadata(file_path_str)
+    schema = metadata.schema.to_arrow_schema()
+    numeric = [
+        field.name for field in schema
+        if pa.types.is_integer(field.type) or pa.types.is_floating(field.type)
+    ]
+    return schema.names, numeric, metadata.num_rows
+
+
+def read_dataset_columns(
+    file_path_str: str, columns: Union[Sequence[str], str]
+) -> pd.DataFrame:
+    """
+    Read the given columns (or NUMERIC_COLUMNS) of a dataset; missing names are skipped.
+    Local Parquet copies are decoded column by column and each column is
+    cached on its own, so a chart reading 2 of 50 columns never decodes the
+    other 48. CSV and remote files have no column index to seek and come
+    from the whole cached frame, which may hold extra columns.
+    """
+    if _is_url(file_path_str) or not file_path_str.endswith(".parquet"):
+        return read_dataset(file_path_str)
+
+    version = _file_version(file_path_str)
+    if version is None:
+        raise FileNotFoundError(f"Dataset file not found: {file_path_str}")
+    with _frame_lock:
+        entry = _frame_cache.get(file_path_str)
+    if entry is not None and entry[0] == version:
+        return entry[1]
+
+    try:
+        names, numeric, num_rows = _parquet_layout(file_path_str, version)
+    except Exception as e:
+        raise RuntimeError(f"Failed to read dataset file: {e}")
+    if columns == NUMERIC_COLUMNS:
+        wanted = numeric
+    else:
+        wanted = [c for c in dict.fromkeys(columns) if c in names]
+    if not wanted:
+        return pd.DataFrame(index=pd.RangeIndex(num_rows))
+
+    found: dict[str, pd.Series] = {}
+    with _frame_lock:
+        for column in wanted:
+            entry = _frame_cache.get((file_path_str, column))
+            if entry is not None and entry[0] == version:
+                found[column] = entry[1]
+    missing = [c for c in wanted if c not in found]
+    if missing:
+        try:
+            df = _read_parquet(file_path_str, columns=missing)
+        except Exception as e:
+            raise RuntimeError(f"Failed to read dataset file: {e}")
+        with _frame_lock:
+            for column in missing:
+                found[column] = df[column]
+                try:
+                    _frame_cache[(file_path_str, column)] = (version, df[column])
+                except ValueError:
+                    pass  # Larger than the whole cache; serve it uncached
+    return pd.concat([found[c] for c in wanted], axis=1, copy=False)
+
+
+def read_dataset_view(
+    file_path_str: str,
+    columns: Union[Sequence[str], str, None] = None,
+    row_filter: Optional[tuple] = None,
+) -> pd.DataFrame:
+    """
+    Read the columns a chart uses, with an optional (column, operator, value)
+    row filter applied. columns=None reads the whole dataset. The result may
+    hold extra columns when it comes from a cached whole frame; when
+    filtering, the mask is computed once and only the requested columns are
+    gathered through it, so a filter column the chart doesn't read is never
+    copied. Columns that don't exist are left out for the caller's own
+    validation to report.
+    """
+    filter_column, filter_operator, filter_value = row_filter or (None, None, None)
+    # Same conditions under which apply_filter leaves the frame untouched
+    filtering = bool(filter_column and filter_operator and filter_value is not None)
+    # Taken before reading, so a file replaced mid-read can't label the old
+    # rows with the new version
+    version = _file_version(file_path_str) if filtering else None
+
+    if columns is None:
+        df = read_dataset(file_path_str)
+        keep = None
+    elif columns == NUMERIC_COLUMNS:
+        df = read_dataset_columns(file_path_str, NUMERIC_COLUMNS)
+        keep = list(df.columns)
+        if filtering and filter_column not in df.columns:
+            # Non-numeric filter column: it still has to be read to filter on
+            extra = read_dataset_columns(file_path_str, [filter_column])
+            if filter_column in extra.columns:
+                df = pd.concat([df, extra[filter_column]], axis=1, copy=False)
+    else:
+        wanted = list(dict.fromkeys(c for c in (*columns, filter_column if filtering else None) if c))
+        df = read_dataset_columns(file_path_str, wanted)
+        keep = [c for c in dict.fromkeys(columns) if c and c in df.columns]
+
+    if not filtering or filter_column not in df.columns:
+        return df
+    mask = filter_mask(
+        df, filter_column, filter_operator, filter_value, codes_key=(file_path_str, version)
+    )
+    if keep is None or len(keep) == len(df.columns):
+        return df if mask is None else take_rows(df, mask)
+    return df[keep] if mask is None else take_rows(df, mask, keep)
+
+
+def evict_dataset_path(dataset_id: str) -> None:
+    """Drop the cached path lookup for a dataset."""
+    with _path_lock:
+        _path_cache.pop(hashkey(dataset_id), None)
+
+
+def evict_dataset_file(file_path_str: str) -> None:
+    """Drop a cached frame and its cached columns, e.g. when the file at that path is replaced."""
+    with _frame_lock:
+        for key in [k for k in _frame_cache if k == file_path_str or (isinstance(k, tuple) and k[0] == file_path_str)]:
+            _frame_cache.pop(key, None)
+
+
+def load_dataset(db: Session, dataset_id: str) -> pd.DataFrame:
+    """
+    Load a dataset from disk given its dataset_id.
+    Fetches the file path from DB and reads the dataset from it.
+    """
+    return read_dataset(get_dataset_file_path(db, dataset_id))
@@ -1,40 +1,163 @@
-from typing import Any
+import math
+import os
+import re
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable
 
 import numpy as np
 import pandas as pd
 
+from app.services.numeric_kernels import column_histograms, column_ranges
 
-def _make_serializable(value: Any) -> Any:
-    """Convert numpy types to Python native types for JSON serialization."""
-    if isinstance(value, (np.integer,)):
-        return int(value)
-    elif isinstance(value, (np.floating,)):
-        if np.isnan(value) or np.isinf(value):
-            return None
-        return float(value)
-    elif isinstance(value, np.ndarray):
-        return value.tolist()
-    elif pd.isna(value):
-        return None
-    return value
+# Threads for the per-column work (type detection, value counts) in one
+# profile. Profiles already run in parallel in the compute pool, so by
+# default each stays single-threaded; raise this when COMPUTE_WORKERS is
+# below the core count.
+PROFILE_THREADS = int(os.getenv("PROFILE_THREADS") or "1")
+
+
+def _finite_or_none(value: Any) -> Any:
+    """A .tolist() statistic, or None for NaN/inf, which JSON can't represent."""
+    return value if math.isfinite(value) else None
+
+
+# Probed values are checked for a digit first: apart from NaT spellings and
+# relative keywords (compared stripped and lower-cased), pd.to_datetime
+# rejects every string without one, so a column of names or labels never
+# pays for the exception-driven parse attempt.
+_DIGIT_RE = re.compile(r"\d")
+_DIGITLESS_DATETIME_WORDS = frozenset({"", "nan", "nat", "now", "today"})
+DATETIME_PROBE_SIZE = 100
+
+
+def _may_be_datetimes(values: list) -> bool:
+    """False if any value is a string pd.to_datetime is certain to reject."""
+    for value in values:
+        if (
+            isinstance(value, str)
+            and _DIGIT_RE.search(value) is None
+            and value.strip().lower() not in _DIGITLESS_DATETIME_WORDS
+        ):
+            return False
+    return True
+
+
+def is_datetime_like(series: pd.Series) -> bool:
+    """Whether the first non-null values of an object column all parse as datetimes."""
+    sample = series.iloc[:DATETIME_PROBE_SIZE].dropna()
+    if not _may_be_datetimes(sample.tolist()):
+        return False
+
+    # Only look past the head if it is mostly missing, and then gather the
+    # first non-null values by position rather than dropna-copying the column
+    if len(sample) < DATETIME_PROBE_SIZE and len(series) > DATETIME_PROBE_SIZE:
+        head_count = len(sample)
+        sample = series.iloc[np.flatnonzero(series.notna().to_numpy())[:DATETIME_PROBE_SIZE]]
+        if not _may_be_datetimes(sample.iloc[head_count:].tolist()):
+            return False
+
+    try:
+        pd.to_datetime(sample)
+        return True
+    except (ValueError, TypeError):
+        return False
+
+
+# dtype.kind -> detected type for everything but object and category
+# columns; other kinds (timedelta, period, interval, strings) are "unknown"
+_KIND_TYPES = {
+    "i": "numeric", "u": "numeric", "f": "numeric", "c": "numeric", "b": "numeric",
+    "M": "datetime",
+}
 
 
-def _detect_column_type(series: pd.Series) -> str:
+def detect_column_type(series: pd.Series) -> str:
     """Detect the type of a pandas Series."""
-    if pd.api.types.is_numeric_dtype(series):
-        return "numeric"
-    elif pd.api.types.is_datetime64_any_dtype(series):
-        return "datetime"
-    elif pd.api.types.is_categorical_dtype(series) or pd.api.types.is_object_dtype(series):
+    dtype = series.dtype
+    if dtype == object:
         # Check if it looks like a datetime string
-        if series.dtype == object:
-            try:
-                pd.to_datetime(series.dropna().head(100))
-                return "datetime"
-            except (ValueError, TypeError):
-                pass
+        return "datetime" if is_datetime_like(series) else "categorical"
+    if isinstance(dtype, pd.CategoricalDtype):
         return "categorical"
-    return "unknown"
+    return _KIND_TYPES.get(dtype.kind, "unknown")
+
+
+HISTOGRAM_BINS = 10
+
+
+def _non_null_values(series: pd.Series) -> np.ndarray:
+    """The column's non-null values as an array, without building a new Series."""
+    values = series.to_numpy()
+    return values[~pd.isna(values)]
+
+
+def _describe_numeric(numeric_df: pd.DataFrame) -> tuple[list, list]:
+    """
+    (min, max) and np.histogram of every numeric column's non-null values,
+    computed for the float64 and integer columns from one shared range pass.
+    Other columns, and any the batch can't reproduce exactly, get None.
+    """
+    dtypes = numeric_df.dtypes.tolist()
+    ranges = [None] * len(dtypes)
+    histograms = [None] * len(dtypes)
+    # np.histogram bins float32 columns in float32, and integers beyond 2**53
+    # don't survive the float64 cast, so those stay per-column
+    batch = [
+        i for i, dtype in enumerate(dtypes)
+        if isinstance(dtype, np.dtype) and (dtype == np.float64 or dtype.kind in "iu")
+    ]
+    if not batch or not len(numeric_df):
+        return ranges, histograms
+
+    values = numeric_df.iloc[:, batch].to_numpy(dtype=np.float64)
+    lo, hi = column_ranges(values)
+    hists = column_histograms(values, HISTOGRAM_BINS, lo, hi)
+    for i, col_lo, col_hi, hist in zip(batch, lo.tolist(), hi.tolist(), hists):
+        if dtypes[i].kind == "f":
+            ranges[i] = (col_lo, col_hi)
+            histograms[i] = hist
+        elif max(-col_lo, col_hi) < 2**53:
+            ranges[i] = (int(col_lo), int(col_hi))
+            histograms[i] = hist
+    return ranges, histograms
+
+
+TOP_VALUES = 10
+
+
+def _top_values(series: pd.Series) -> tuple[int, list, list]:
+    """
+    nunique() and value_counts().head(TOP_VALUES) of a categorical column as
+    (unique_count, values, counts). Object columns get both from a single
+    factorize instead of two hash-table builds.
+    """
+    if series.dtype != object:
+        value_counts = series.value_counts().head(TOP_VALUES)
+        return series.nunique(), value_counts.index.tolist(), value_counts.tolist()
+
+    codes, uniques = pd.factorize(series.to_numpy())
+    counts = np.bincount(codes[codes >= 0], minlength=len(uniques))
+    # value_counts sorts descending by argsorting the reversed counts and
+    # reversing back; doing the same keeps ties in the same order
+    order = len(uniques) - 1 - counts[::-1].argsort(kind="quicksort")
+    top = order[::-1][:TOP_VALUES]
+    return len(uniques), uniques[top].tolist(), counts[top].tolist()
+
+
+def _top_values_or_none(series: pd.Series) -> Any:
+    """_top_values, or None if the column can't be counted."""
+    try:
+        return _top_values(series)
+    except Exception:
+        return None
+
+
+def _map_columns(func: Callable[[pd.Series], Any], columns: list) -> list:
+    """list(map(func, columns)), spread over PROFILE_THREADS threads."""
+    if PROFILE_THREADS <= 1 or len(columns) <= 1:
+        return list(map(func, columns))
+    with ThreadPoolExecutor(max_workers=min(PROFILE_THREADS, len(columns))) as pool:
+        return list(pool.map(func, columns))
 
 
 def profile_dataframe(df: pd.DataFrame) -> dict:
@@ -49,10 +172,27 @@ def profile_dataframe(df: pd.DataFrame) -> dict:
     numeric_stats = []
     category_stats = []
 
-    for col_name in df.columns:
+    col_types = _map_columns(detect_column_type, [df[col_name] for col_name in df.columns])
+    missing_counts = df.isna().sum().tolist()
+
+    # Reduce all numeric columns in one call per statistic instead of one
+    # pandas call per column
+    numeric_df = df.iloc[:, [i for i, col_type in enumerate(col_types) if col_type == "numeric"]]
+    # min/max come from the histogram range pass; pandas only reduces the rest
+    ranges, histograms = _describe_numeric(numeric_df)
+    unranged = [i for i, col_range in enumerate(ranges) if col_range is None]
+    unranged_df = numeric_df.iloc[:, unranged]
+    for i, min_value, max_value in zip(unranged, unranged_df.min().tolist(), unranged_df.max().tolist()):
+        ranges[i] = (min_value, max_value)
+    numeric_summary = zip(numeric_df.mean().tolist(), numeric_df.std().tolist(), ranges)
+    histograms = iter(histograms)
+    category_counts = iter(_map_columns(
+        _top_values_or_none,
+        [df[col_name] for col_name, col_type in zip(df.columns, col_types) if col_type == "categorical"],
+    ))
+
+    for col_name, col_type, missing_count in zip(df.columns, col_types, missing_counts):
         series = df[col_name]
-        col_type = _detect_column_type(series)
-        missing_count = int(series.isna().sum())
         missing_percentage = round((missing_count / row_count) * 100, 2) if row_count > 0 else 0.0
 
         column_info = {
@@ -67,52 +207,60 @@ def profile_dataframe(df: pd.DataFrame) -> dict:
         if col_type == "numeric":
             # Calculate histogram
             try:
-                hist, bin_edges = np.histogram(series.dropna(), bins=10)
+                hist, bin_edges = next(histograms) or np.histogram(_non_null_values(series), bins=HISTOGRAM_BINS)
+                # Edges are always finite: np.histogram rejects non-finite ranges
+                edges = bin_edges.tolist()
                 histogram = []
-                for i in range(len(hist)):
+                for i, count in enumerate(hist.tolist()):
                     histogram.append({
-                        "bin_start": _make_serializable(bin_edges[i]),
-                        "bin_end": _make_serializable(bin_edges[i+1]),
-                        "count": int(hist[i])
+                        "bin_start": edges[i],
+                        "bin_end": edges[i+1],
+                        "count": count
                     })
             except Exception:
                 histogram = []
 
+            mean, std, (min_value, max_value) = next(numeric_summary)
             stats = {
                 "column": str(col_name),
-                "mean": _make_serializable(series.mean()),
-                "std": _make_serializable(series.std()),
-                "min": _make_serializable(series.min()),
-                "max": _make_serializable(series.max()),
+                "mean": _finite_or_none(mean),
+                "std": _finite_or_none(std),
+                "min": _finite_or_none(min_value),
+                "max": _finite_or_none(max_value),
                 "histogram": histogram
             }
             numeric_stats.append(stats)
             
         elif col_type == "categorical":
             # Calculate top values
-            try:
-                value_counts = series.value_counts().head(10)
+            counted = next(category_counts)
+            if counted is not None:
+                unique_count, values, counts = counted
                 top_values = []
-                for val, count in value_counts.items():
+                for val, count in zip(values, counts):
                     top_values.append({
                         "value": str(val),
-                        "count": int(count)
+                        "count": count
                     })
                 
                 cat_stats = {
                     "column": str(col_name),
-                    "unique_count": int(series.nunique()),
+                    "unique_count": unique_count,
                     "top_values": top_values
                 }
                 category_stats.append(cat_stats)
-            except Exception:
-                pass
 
     # Get first 5 rows as samples
     samples = []
     try:
-        sample_df = df.head(5).replace({np.nan: None})
-        samples = sample_df.to_dict(orient="records")
+        # Null out NaN/NaT in the 5 records rather than running a frame-wide replace
+        samples = [
+            {
+                key: None if value is pd.NaT or (isinstance(value, float) and value != value) else value
+                for key, value in record.items()
+            }
+            for record in df.head(5).to_dict(orient="records")
+        ]
     except Exception:
         pass
 
@@ -2,53 +2,143 @@
 Cloudinary storage service for persisting CSV datasets.
 Fallback to local storage if Cloudinary is not configured.
 """
+import asyncio
 import os
+import shutil
+import threading
 import cloudinary
+import cloudinary.api
 import cloudinary.uploader
+import cloudinary.utils
+import pyarrow as pa
+import urllib3
 from pathlib import Path
 from io import BytesIO
+from typing import Any, BinaryIO, Callable, Iterable
+from cachetools import TTLCache
+from urllib3.util import Retry, Timeout
+
+_CLOUDINARY_CONFIGURED = False
+
+
+def reload_config() -> None:
+    """
+    Configure Cloudinary from the environment. Runs at import; call it again
+    after changing the CLOUDINARY_* variables.
+    """
+    global _CLOUDINARY_CONFIGURED
+    cloud_name = os.getenv("CLOUDINARY_CLOUD_NAME")
+    api_key = os.getenv("CLOUDINARY_API_KEY")
+    api_secret = os.getenv("CLOUDINARY_API_SECRET")
+    cloudinary.config(
+        cloud_name=cloud_name,
+        api_key=api_key,
+        api_secret=api_secret,
+        secure=True
+    )
+    _CLOUDINARY_CONFIGURED = bool(cloud_name and api_key and api_secret)
+
 
 # Configure Cloudinary
-cloudinary.config(
-    cloud_name=os.getenv("CLOUDINARY_CLOUD_NAME"),
-    api_key=os.getenv("CLOUDINARY_API_KEY"),
-    api_secret=os.getenv("CLOUDINARY_API_SECRET"),
-    secure=True
-)
+reload_config()
 
 # Local storage fallback
 STORAGE_DIR = Path("storage")
 
+# Pooled keep-alive connections for file downloads, so repeat fetches from
+# Cloudinary's CDN skip the TCP + TLS handshake. urllib3 is what the
+# Cloudinary SDK itself uses for its API calls. Rate-limited (429) responses
+# are retried with exponential backoff, honouring Retry-After.
+_http = urllib3.PoolManager(
+    num_pools=10,
+    maxsize=50,
+    retries=Retry(total=3, backoff_factor=0.2, status_forcelist=[429, 502, 503, 504]),
+    timeout=Timeout(connect=3, read=30),
+)
+
+# Cloudinary answers keyed by (project_id, dataset_id, extension), so repeat checks and
+# reads skip the round trip (file_exists goes through the rate-limited admin
+# API). Only positive existence checks are kept, so a file saved by another
+# worker is never reported missing; contents are kept up to
+# FILE_CACHE_MAX_SIZE each, bounded by total size.
+FILE_CACHE_BYTES = int(os.getenv("FILE_CACHE_BYTES") or "64000000")
+FILE_CACHE_MAX_SIZE = 2_000_000
+
+_exists_cache: TTLCache = TTLCache(maxsize=10_000, ttl=60)
+_content_cache: TTLCache = TTLCache(maxsize=FILE_CACHE_BYTES, ttl=120, getsizeof=len)
+_cache_lock = threading.Lock()
+
+
+def _forget_file(project_id: str, dataset_id: str, extension: str) -> None:
+    """Drop cached answers for a file that is being replaced or removed."""
+    key = (project_id, dataset_id, extension)
+    with _cache_lock:
+        _exists_cache.pop(key, None)
+        _content_cache.pop(key, None)
+
 
 def is_cloudinary_configured() -> bool:
     """Check if Cloudinary credentials are set."""
-    return all([
-        os.getenv("CLOUDINARY_CLOUD_NAME"),
-        os.getenv("CLOUDINARY_API_KEY"),
-        os.getenv("CLOUDINARY_API_SECRET")
-    ])
+    return _CLOUDINARY_CONFIGURED
 
 
-def get_cloudinary_public_id(project_id: str, dataset_id: str) -> str:
+def get_cloudinary_public_id(project_id: str, dataset_id: str, extension: str = "csv") -> str:
     """Generate a unique public ID for the file in Cloudinary."""
-    return f"dambo/datasets/{project_id}/{dataset_id}"
+    public_id = f"dambo/datasets/{project_id}/{dataset_id}"
+    if extension != "csv":
+        # Keep the extension in the public_id so the URL tells readers the format
+        public_id = f"{public_id}.{extension}"
+    return public_id
 
 
-def get_local_storage_path(project_id: str, dataset_id: str) -> Path:
+def get_local_storage_path(project_id: str, dataset_id: str, extension: str = "csv") -> Path:
     """Get the full path for storing a dataset file locally."""
-    return STORAGE_DIR / project_id / f"{dataset_id}.csv"
+    return STORAGE_DIR / project_id / f"{dataset_id}.{extension}"
+
+
+# Copy buffer for streamed saves
+COPY_CHUNK_SIZE = 1 << 20
+
+# Files saved under an extension ending in this are zstd-compressed, using
+# pyarrow's codec; CSVs shrink several-fold for upload, storage and egress
+COMPRESSED_SUFFIX = ".zst"
+
+
+def _zstd_compress(source: BinaryIO) -> bytes:
+    """The rest of source, zstd-compressed a chunk at a time."""
+    sink = pa.BufferOutputStream()
+    with pa.CompressedOutputStream(sink, "zstd") as out:
+        shutil.copyfileobj(source, out, COPY_CHUNK_SIZE)
+    return sink.getvalue().to_pybytes()
 
 
-def save_file(project_id: str, dataset_id: str, content: bytes) -> str:
+def _zstd_reader(stream: BinaryIO) -> pa.NativeFile:
+    """A file object reading stream's zstd-compressed bytes decompressed."""
+    return pa.CompressedInputStream(pa.PythonFile(stream, mode="r"), "zstd")
+
+
+def save_file(project_id: str, dataset_id: str, content: bytes | BinaryIO, extension: str = "csv") -> str:
     """
     Save file content to Cloudinary (or local disk as fallback).
+    content may be bytes or a binary file object, which is streamed in
+    chunks: from its current position to disk, or from the start to
+    Cloudinary, which closes it when done. With an extension ending in
+    COMPRESSED_SUFFIX the stored file is zstd-compressed, read from the
+    current position either way.
     Returns the file path/URL as string.
     """
-    if is_cloudinary_configured():
+    source = BytesIO(content) if isinstance(content, bytes) else content
+    compress = extension.endswith(COMPRESSED_SUFFIX)
+    _forget_file(project_id, dataset_id, extension)
+    if _CLOUDINARY_CONFIGURED:
         # Upload to Cloudinary as raw file
-        public_id = get_cloudinary_public_id(project_id, dataset_id)
-        result = cloudinary.uploader.upload(
-            BytesIO(content),
+        public_id = get_cloudinary_public_id(project_id, dataset_id, extension)
+        if compress:
+            source = BytesIO(_zstd_compress(source))
+        # upload() would read the whole file into one request body;
+        # upload_large sends it in fixed-size chunks
+        result = cloudinary.uploader.upload_large(
+            source,
             resource_type="raw",
             public_id=public_id,
             overwrite=True,
@@ -57,67 +147,162 @@ def save_file(project_id: str, dataset_id: str, content: bytes) -> str:
         return result["secure_url"]
     else:
         # Fallback to local storage
-        file_path = get_local_storage_path(project_id, dataset_id)
+        file_path = get_local_storage_path(project_id, dataset_id, extension)
         file_path.parent.mkdir(parents=True, exist_ok=True)
-        with open(file_path, "wb") as f:
-            f.write(content)
+        with (pa.CompressedOutputStream(str(file_path), "zstd") if compress else open(file_path, "wb")) as f:
+            shutil.copyfileobj(source, f, COPY_CHUNK_SIZE)
         return str(file_path)
 
 
-def load_file(project_id: str, dataset_id: str) -> bytes | None:
+def load_file(project_id: str, dataset_id: str, extension: str = "csv") -> bytes | None:
     """
-    Load file content from Cloudinary (or local disk as fallback).
+    Load file content from Cloudinary (or local disk as fallback),
+    decompressed if it was saved compressed.
     Returns file content as bytes or None if not found.
     """
-    if is_cloudinary_configured():
+    compressed = extension.endswith(COMPRESSED_SUFFIX)
+    if _CLOUDINARY_CONFIGURED:
+        key = (project_id, dataset_id, extension)
+        with _cache_lock:
+            content = _content_cache.get(key)
+        if content is not None:
+            return content
         try:
-            import requests
-            public_id = get_cloudinary_public_id(project_id, dataset_id)
+            public_id = get_cloudinary_public_id(project_id, dataset_id, extension)
             # Get the URL for the raw file
-            url = cloudinary.CloudinaryResource(
-                public_id, 
-                resource_type="raw"
-            ).build_url()
-            response = requests.get(url)
-            if response.status_code == 200:
-                return response.content
+            url = cloudinary.utils.cloudinary_url(public_id, resource_type="raw")[0]
+            response = _http.request("GET", url)
+            if response.status == 200:
+                content = _zstd_reader(BytesIO(response.data)).read() if compressed else response.data
+                if len(content) <= FILE_CACHE_MAX_SIZE:
+                    with _cache_lock:
+                        _content_cache[key] = content
+                return content
             return None
         except Exception:
             return None
     else:
         # Fallback to local storage
-        file_path = get_local_storage_path(project_id, dataset_id)
+        file_path = get_local_storage_path(project_id, dataset_id, extension)
         if file_path.exists():
-            with open(file_path, "rb") as f:
+            with (pa.input_stream(str(file_path), compression="zstd") if compressed else open(file_path, "rb")) as f:
                 return f.read()
         return None
 
 
-def file_exists(project_id: str, dataset_id: str) -> bool:
+def load_file_to_path(project_id: str, dataset_id: str, dest: Path, extension: str = "csv") -> bool:
+    """
+    Stream a dataset file from Cloudinary (or local disk as fallback) into
+    dest, decompressed if it was saved compressed, holding at most one
+    chunk in memory. Returns False if not found.
+    """
+    compressed = extension.endswith(COMPRESSED_SUFFIX)
+    if _CLOUDINARY_CONFIGURED:
+        try:
+            public_id = get_cloudinary_public_id(project_id, dataset_id, extension)
+            url = cloudinary.utils.cloudinary_url(public_id, resource_type="raw")[0]
+            response = _http.request("GET", url, preload_content=False)
+            try:
+                if response.status != 200:
+                    return False
+                source = _zstd_reader(response) if compressed else response
+                with open(dest, "wb") as f:
+                    shutil.copyfileobj(source, f, COPY_CHUNK_SIZE)
+                return True
+            finally:
+                response.release_conn()
+        except Exception:
+            return False
+    else:
+        # Fallback to local storage
+        file_path = get_local_storage_path(project_id, dataset_id, extension)
+        if not file_path.exists():
+            return False
+        if compressed:
+            with pa.input_stream(str(file_path), compression="zstd") as source, open(dest, "wb") as f:
+                shutil.copyfileobj(source, f, COPY_CHUNK_SIZE)
+        else:
+            shutil.copyfile(file_path, dest)
+        return True
+
+
+def file_exists(project_id: str, dataset_id: str, extension: str = "csv") -> bool:
     """Check if a dataset file exists."""
-    if is_cloudinary_configured():
+    if _CLOUDINARY_CONFIGURED:
+        key = (project_id, dataset_id, extension)
+        with _cache_lock:
+            if _exists_cache.get(key):
+                return True
         try:
-            public_id = get_cloudinary_public_id(project_id, dataset_id)
+            public_id = get_cloudinary_public_id(project_id, dataset_id, extension)
             result = cloudinary.api.resource(public_id, resource_type="raw")
-            return result is not None
         except Exception:
             return False
+        if result is None:
+            return False
+        with _cache_lock:
+            _exists_cache[key] = True
+        return True
     else:
-        return get_local_storage_path(project_id, dataset_id).exists()
+        return get_local_storage_path(project_id, dataset_id, extension).exists()
 
 
-def delete_file(project_id: str, dataset_id: str) -> bool:
+def delete_file(project_id: str, dataset_id: str, extension: str = "csv") -> bool:
     """Delete a dataset file."""
-    if is_cloudinary_configured():
+    _forget_file(project_id, dataset_id, extension)
+    if _CLOUDINARY_CONFIGURED:
         try:
-            public_id = get_cloudinary_public_id(project_id, dataset_id)
+            public_id = get_cloudinary_public_id(project_id, dataset_id, extension)
             cloudinary.uploader.destroy(public_id, resource_type="raw")
             return True
         except Exception:
             return False
     else:
-        file_path = get_local_storage_path(project_id, dataset_id)
+        file_path = get_local_storage_path(project_id, dataset_id, extension)
         if file_path.exists():
             file_path.unlink()
             return True
         return False
+
+
+# Storage calls the bulk helpers run at once; Cloudinary rate-limits bursts
+BULK_CONCURRENCY = 5
+
+
+async def _run_bulk(func: Callable[..., Any], calls: Iterable[tuple]) -> list:
+    """
+    func(*args) for each args tuple, BULK_CONCURRENCY at a time in worker
+    threads. Results come back in call order, with exceptions returned in
+    place of results rather than raised.
+    """
+    semaphore = asyncio.Semaphore(BULK_CONCURRENCY)
+
+    async def run_one(args: tuple) -> Any:
+        async with semaphore:
+            return await asyncio.to_thread(func, *args)
+
+    return await asyncio.gather(*(run_one(args) for args in calls), return_exceptions=True)
+
+
+async def save_files(files: Iterable[tuple[str, str, bytes | BinaryIO]], extension: str = "csv") -> list:
+    """save_file for each (project_id, dataset_id, content), concurrently."""
+    return await _run_bulk(
+        lambda project_id, dataset_id, content: save_file(project_id, dataset_id, content, extension),
+        files,
+    )
+
+
+async def load_files(ids: Iterable[tuple[str, str]], extension: str = "csv") -> list:
+    """load_file for each (project_id, dataset_id), concurrently."""
+    return await _run_bulk(
+        lambda project_id, dataset_id: load_file(project_id, dataset_id, extension),
+        ids,
+    )
+
+
+async def delete_files(ids: Iterable[tuple[str, str]], extension: str = "csv") -> list:
+    """delete_file for each (project_id, dataset_id), concurrently."""
+    return await _run_bulk(
+        lambda project_id, dataset_id: delete_file(project_id, dataset_id, extension),
+        ids,
+    )
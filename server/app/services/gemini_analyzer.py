@@ -1,16 +1,75 @@
 """Gemini Analyzer Service - AI-powered intelligent dataset analysis."""
 
+import asyncio
 import os
 import json
+import hashlib
 import logging
 from typing import Any, Optional
 
 import google.generativeai as genai
+import numpy as np
+from cachetools import TTLCache
+
+from app.services.gemini_quota import gemini_slots
 
 logger = logging.getLogger(__name__)
 
 # Configure Gemini
 GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
+# Analyses analyze_many runs at once
+BATCH_CONCURRENCY = 5
+
+
+# Everything in the prompt but the dataset summary. Set once on the model,
+# rather than rebuilt around the summary on every request.
+_SYSTEM_INSTRUCTION = """You are an expert ML data scientist. Each message is a JSON dataset summary; analyze it and provide actionable insights for data preparation.
+
+Provide a JSON response with the following structure:
+{
+    "scatter_plot_recommendations": [
+        {
+            "x": "column_x",
+            "y": "column_y", 
+            "reason": "Brief explanation of why this relationship is interesting"
+        }
+    ],
+    "feature_importance_hints": [
+        {
+            "column": "column_name",
+            "role": "target|feature|id|drop",
+            "reason": "Brief explanation"
+        }
+    ],
+    "data_prep_tips": [
+        "Specific, actionable tip 1",
+        "Specific, actionable tip 2"
+    ],
+    "encoding_suggestions": [
+        {
+            "column": "column_name",
+            "method": "one_hot|label|ordinal|target",
+            "reason": "Brief explanation"
+        }
+    ],
+    "scaling_suggestions": [
+        {
+            "column": "column_name",
+            "method": "standard|minmax|robust|none",
+            "reason": "Brief explanation"
+        }
+    ],
+    "overall_assessment": "2-3 sentence summary of data quality and ML readiness"
+}
+
+Focus on:
+1. Most interesting column relationships for scatter plots (pick top 2-3)
+2. Which columns are likely targets vs features vs IDs to drop
+3. Practical data cleaning steps based on missing data and outliers
+4. Specific encoding recommendations for categorical columns
+5. Scaling recommendations for numeric columns
+
+Be concise and actionable. Only include relevant suggestions."""
 
 
 def _configure_gemini():
@@ -22,6 +81,7 @@ def _configure_gemini():
     genai.configure(api_key=GEMINI_API_KEY)
     return genai.GenerativeModel(
         model_name="gemini-2.0-flash",
+        system_instruction=_SYSTEM_INSTRUCTION,
         generation_config={
             "response_mime_type": "application/json",
             "temperature": 0.3,
@@ -29,15 +89,26 @@ def _configure_gemini():
     )
 
 
-# Initialize model (lazy)
+# Initialize model (lazy). _configure_gemini runs once per process, also
+# when it finds no API key, so a disabled Gemini doesn't re-check and warn
+# on every call.
 _model = None
+_model_initialized = False
+
+# Parsed responses keyed by a hash of the dataset summary, so re-analyzing
+# the same dataset doesn't spend another paid request. Only touched from
+# the event loop, so it needs no lock.
+_insights_cache: TTLCache = TTLCache(maxsize=1024, ttl=3600)
 
 
 def _get_model():
     """Get or initialize the Gemini model."""
-    global _model
-    if _model is None:
+    global _model, _model_initialized
+    # Only called from the event loop, and nothing awaits between the check
+    # and the assignment, so concurrent requests can't both initialize
+    if not _model_initialized:
         _model = _configure_gemini()
+        _model_initialized = True
     return _model
 
 
@@ -57,61 +128,19 @@ async def analyze_with_gemini(analysis_data: dict) -> Optional[dict]:
     
     try:
         # Build a concise summary for Gemini (avoid sending raw data)
-        summary = _build_analysis_summary(analysis_data)
+        summary_json = json.dumps(_build_analysis_summary(analysis_data), sort_keys=True)
+        cache_key = hashlib.blake2b(summary_json.encode(), digest_size=16).hexdigest()
+        cached = _insights_cache.get(cache_key)
+        if cached is not None:
+            return cached
         
-        prompt = f"""You are an expert ML data scientist. Analyze this dataset summary and provide actionable insights for data preparation.
-
-Dataset Summary:
-{json.dumps(summary, indent=2)}
-
-Provide a JSON response with the following structure:
-{{
-    "scatter_plot_recommendations": [
-        {{
-            "x": "column_x",
-            "y": "column_y", 
-            "reason": "Brief explanation of why this relationship is interesting"
-        }}
-    ],
-    "feature_importance_hints": [
-        {{
-            "column": "column_name",
-            "role": "target|feature|id|drop",
-            "reason": "Brief explanation"
-        }}
-    ],
-    "data_prep_tips": [
-        "Specific, actionable tip 1",
-        "Specific, actionable tip 2"
-    ],
-    "encoding_suggestions": [
-        {{
-            "column": "column_name",
-            "method": "one_hot|label|ordinal|target",
-            "reason": "Brief explanation"
-        }}
-    ],
-    "scaling_suggestions": [
-        {{
-            "column": "column_name",
-            "method": "standard|minmax|robust|none",
-            "reason": "Brief explanation"
-        }}
-    ],
-    "overall_assessment": "2-3 sentence summary of data quality and ML readiness"
-}}
-
-Focus on:
-1. Most interesting column relationships for scatter plots (pick top 2-3)
-2. Which columns are likely targets vs features vs IDs to drop
-3. Practical data cleaning steps based on missing data and outliers
-4. Specific encoding recommendations for categorical columns
-5. Scaling recommendations for numeric columns
-
-Be concise and actionable. Only include relevant suggestions."""
-
-        response = model.generate_content(prompt)
+        # The instructions are the model's system instruction, so the request
+        # only carries the summary JSON. The async client awaits the
+        # round-trip instead of blocking the event loop
+        async with gemini_slots:
+            response = await model.generate_content_async(summary_json)
         result = json.loads(response.text)
+        _insights_cache[cache_key] = result
         
         logger.info("Gemini analysis completed successfully")
         return result
@@ -124,6 +153,17 @@ Be concise and actionable. Only include relevant suggestions."""
         return None
 
 
+async def analyze_many(analyses: list[dict]) -> list[Optional[dict]]:
+    """analyze_with_gemini for each analysis, BATCH_CONCURRENCY at a time."""
+    batch_slots = asyncio.Semaphore(BATCH_CONCURRENCY)
+
+    async def analyze_one(analysis_data: dict) -> Optional[dict]:
+        async with batch_slots:
+            return await analyze_with_gemini(analysis_data)
+
+    return await asyncio.gather(*(analyze_one(analysis_data) for analysis_data in analyses))
+
+
 def _build_analysis_summary(data: dict) -> dict:
     """Build a concise summary for Gemini, avoiding raw data transfer."""
     overview = data.get("dataset_overview", {})
@@ -182,33 +222,42 @@ def compute_scatter_recommendations(
     """
     recommendations = []
     
+    # Only the 5 strongest can be recommended, so skip building records for
+    # the rest. Rounding to 4 decimals can tie the 5th strongest with values
+    # up to one rounding step (plus float error) weaker, so those stay in.
+    strength = np.abs(np.fromiter(
+        (np.nan if corr.get("correlation") is None else corr["correlation"] for corr in correlations),
+        dtype=np.float64, count=len(correlations),
+    ))
+    # Lowered threshold to 0.1 to include weaker correlations
+    candidates = np.flatnonzero(strength >= 0.1)
+    if candidates.size > 5:
+        fifth = -np.partition(-strength[candidates], 4)[4]
+        candidates = candidates[strength[candidates] >= fifth - 2e-4]
+    
     # First, try to use correlations
-    for corr in correlations:
-        corr_value = corr.get("correlation")
-        if corr_value is None:
-            continue
-        
-        # Lowered threshold to 0.1 to include weaker correlations
-        if abs(corr_value) >= 0.1:
-            if corr_value > 0.7:
-                relationship = "Strong positive correlation"
-            elif corr_value > 0.3:
-                relationship = "Moderate positive correlation"
-            elif corr_value > 0.1:
-                relationship = "Weak positive correlation"
-            elif corr_value < -0.7:
-                relationship = "Strong negative correlation"
-            elif corr_value < -0.3:
-                relationship = "Moderate negative correlation"
-            else:
-                relationship = "Weak negative correlation"
-                
-            recommendations.append({
-                "x": corr["column_a"],
-                "y": corr["column_b"],
-                "correlation": round(corr_value, 4),
-                "insight": relationship
-            })
+    for i in candidates.tolist():
+        corr = correlations[i]
+        corr_value = corr["correlation"]
+        if corr_value > 0.7:
+            relationship = "Strong positive correlation"
+        elif corr_value > 0.3:
+            relationship = "Moderate positive correlation"
+        elif corr_value > 0.1:
+            relationship = "Weak positive correlation"
+        elif corr_value < -0.7:
+            relationship = "Strong negative correlation"
+        elif corr_value < -0.3:
+            relationship = "Moderate negative correlation"
+        else:
+            relationship = "Weak negative correlation"
+            
+        recommendations.append({
+            "x": corr["column_a"],
+            "y": corr["column_b"],
+            "correlation": round(corr_value, 4),
+            "insight": relationship
+        })
     
     # Sort by absolute correlation value
     recommendations.sort(key=lambda r: abs(r["correlation"]), reverse=True)
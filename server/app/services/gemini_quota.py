@@ -0,0 +1,10 @@
+"""Gemini Quota - request limits shared by every service that calls Gemini."""
+
+import asyncio
+import os
+
+# Cap on in-flight Gemini requests per process, across all services, to stay
+# within the API's QPM quota
+GEMINI_MAX_CONCURRENCY = int(os.getenv("GEMINI_MAX_CONCURRENCY") or "500")
+
+gemini_slots = asyncio.Semaphore(GEMINI_MAX_CONCURRENCY)
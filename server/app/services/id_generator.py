@@ -1,19 +1,45 @@
-import random
+import secrets
 import string
 
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import Session
+
 # Base62 character set: a-z, A-Z, 0-9
 BASE62_CHARS = string.ascii_lowercase + string.ascii_uppercase + string.digits
 
 
+# Random bytes at or above this are redrawn, so b % 62 has no modulo bias
+_UNBIASED_BYTE_LIMIT = 256 - 256 % len(BASE62_CHARS)
+
+
 def generate_short_id(length: int = 6) -> str:
-    """Generate a random base62 string of given length."""
-    return ''.join(random.choices(BASE62_CHARS, k=length))
+    """
+    Generate a random base62 string of given length from the OS CSPRNG,
+    so IDs (which act as access keys in URLs) can't be predicted.
+    """
+    chars = []
+    while len(chars) < length:
+        chars.extend(
+            BASE62_CHARS[b % len(BASE62_CHARS)]
+            for b in secrets.token_bytes(length) if b < _UNBIASED_BYTE_LIMIT
+        )
+    return ''.join(chars[:length])
 
 
-def generate_unique_id(existing_ids: set[str], length: int = 6, max_attempts: int = 100) -> str:
-    """Generate a unique ID that doesn't exist in the given set."""
+def insert_with_unique_id(db: Session, model, id_column: str, values: dict, length: int = 6, max_attempts: int = 100):
+    """
+    Insert a model row under a new random ID and return it. The unique index
+    on id_column rejects collisions (ON CONFLICT DO NOTHING returns no row),
+    so no existing IDs are read. The row is flushed, not committed.
+    """
     for _ in range(max_attempts):
         new_id = generate_short_id(length)
-        if new_id not in existing_ids:
-            return new_id
+        row = db.scalars(
+            insert(model)
+            .values(**values, **{id_column: new_id})
+            .on_conflict_do_nothing(index_elements=[id_column])
+            .returning(model)
+        ).first()
+        if row is not None:
+            return row
     raise RuntimeError("Failed to generate unique ID after max attempts")
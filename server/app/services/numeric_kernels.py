@@ -0,0 +1,247 @@
+"""
+Numba kernels for hot numeric loops in chart aggregation.
+
+Kernels run serially: the compute pool already spreads requests across
+processes, so threading inside a kernel would only oversubscribe the cores.
+cache=True stores the compiled code on disk, so pool workers after the first
+skip JIT compilation.
+"""
+import numpy as np
+from numba import njit
+
+
+@njit(cache=True)
+def _min_max(a):
+    lo = a[0]
+    hi = a[0]
+    for i in range(1, a.size):
+        x = a[i]
+        if x < lo:
+            lo = x
+        elif x > hi:
+            hi = x
+    return lo, hi
+
+
+@njit(cache=True)
+def _uniform_bin_counts(a, edges, width):
+    # Same index arithmetic and 1-ULP edge corrections as np.histogram
+    bins = edges.size - 1
+    lo = edges[0]
+    counts = np.zeros(bins, np.int64)
+    for i in range(a.size):
+        x = a[i]
+        idx = int((x - lo) / width * bins)
+        if idx == bins:
+            idx -= 1
+        if x < edges[idx]:
+            idx -= 1
+        elif idx != bins - 1 and x >= edges[idx + 1]:
+            idx += 1
+        counts[idx] += 1
+    return counts
+
+
+def uniform_histogram(a: np.ndarray, bins: int) -> tuple[np.ndarray, np.ndarray]:
+    """
+    np.histogram(a, bins) for a non-empty, NaN-free float64 or int64 array:
+    one pass for the range and one for the counts, without temporaries.
+    Integers are binned as float64, as np.histogram does.
+    """
+    lo, hi = _min_max(a)
+    if a.dtype.kind == "i" and max(-lo, hi) >= 2**53:
+        # Values no longer exact as float64 can land outside the rounded
+        # edges; leave them to np.histogram's bounds-checked indexing
+        return np.histogram(a, bins)
+    if not (np.isfinite(lo) and np.isfinite(hi)):
+        raise ValueError(f"autodetected range of [{lo}, {hi}] is not finite")
+    if lo == hi:
+        lo, hi = lo - 0.5, hi + 0.5
+    edges = np.linspace(lo, hi, bins + 1)
+    # Like np.histogram, an integer range's width is computed exactly and
+    # rounded once, not taken from the rounded edges
+    width = float(hi - lo)
+    if not width > 0:
+        # Huge values the +-0.5 widening can't separate
+        raise ValueError(f"range of [{lo}, {hi}] is too narrow to bin")
+    return _uniform_bin_counts(a, edges, width), edges
+
+
+@njit(cache=True)
+def _range_and_outliers(a, lower, upper):
+    lo = a[0]
+    hi = a[0]
+    outliers = np.empty_like(a)
+    count = 0
+    for i in range(a.size):
+        x = a[i]
+        if x < lo:
+            lo = x
+        elif x > hi:
+            hi = x
+        if x < lower or x > upper:
+            outliers[count] = x
+            count += 1
+    return lo, hi, outliers[:count].copy()
+
+
+def _linear_quantile(part: np.ndarray, q: float) -> float:
+    # np.percentile's "linear" method, including its lerp rounding
+    virtual = part.size * q + (1 - q) - 1
+    prev = int(np.floor(virtual))
+    nxt = min(prev + 1, part.size - 1)
+    gamma = virtual - prev
+    a, b = float(part[prev]), float(part[nxt])
+    diff = b - a
+    return b - diff * (1 - gamma) if gamma >= 0.5 else a + diff * gamma
+
+
+def _quartile_positions(n: int) -> set:
+    """Sorted positions _linear_quantile reads for q1 and q3 of n values."""
+    kth = set()
+    for q in (0.25, 0.75):
+        prev = int(np.floor(n * q + (1 - q) - 1))
+        kth.update((prev, min(prev + 1, n - 1)))
+    return kth
+
+
+def boxplot_stats(a: np.ndarray) -> tuple:
+    """
+    (min, q1, median, q3, max, mean, outliers) for a non-empty, NaN-free
+    numeric array, matching the pandas quantile/median/mean results. One
+    partition places every quantile position, and one kernel pass finds the
+    range and the 1.5*IQR outliers in their original order.
+    """
+    n = a.size
+    half = n // 2
+    kth = {half, max(half - 1, 0)} | _quartile_positions(n)
+    part = np.partition(a, sorted(kth))
+
+    q1 = _linear_quantile(part, 0.25)
+    q3 = _linear_quantile(part, 0.75)
+    median = float(part[half]) if n % 2 else (float(part[half - 1]) + float(part[half])) / 2
+    iqr = q3 - q1
+    lo, hi, outliers = _range_and_outliers(a, q1 - 1.5 * iqr, q3 + 1.5 * iqr)
+    mean = a.sum(dtype=np.float64) / n
+    return lo, q1, median, q3, hi, mean, outliers
+
+
+@njit(cache=True)
+def _non_nan_copy(a):
+    out = np.empty_like(a)
+    count = 0
+    for i in range(a.size):
+        x = a[i]
+        if not np.isnan(x):
+            out[count] = x
+            count += 1
+    return out[:count]
+
+
+@njit(cache=True)
+def _count_outside(a, lower, upper):
+    count = 0
+    for i in range(a.size):
+        if a[i] < lower or a[i] > upper:
+            count += 1
+    return count
+
+
+def iqr_outlier_count(a: np.ndarray) -> tuple[int, int]:
+    """
+    (non-NaN count, 1.5*IQR outlier count) of a 1-D float64 array, with the
+    quartiles np.percentile's linear method gives on the non-NaN values.
+    One kernel pass copies out the non-NaN values, which are then
+    partitioned in place and counted without further temporaries.
+    """
+    present = _non_nan_copy(a)
+    n = present.size
+    if n == 0:
+        return 0, 0
+    present.partition(sorted(_quartile_positions(n)))
+    q1 = _linear_quantile(present, 0.25)
+    q3 = _linear_quantile(present, 0.75)
+    iqr = q3 - q1
+    return n, _count_outside(present, q1 - 1.5 * iqr, q3 + 1.5 * iqr)
+
+
+@njit(cache=True)
+def _nan_column_ranges(a):
+    ncols = a.shape[1]
+    lo = np.full(ncols, np.nan)
+    hi = np.full(ncols, np.nan)
+    for j in range(ncols):
+        seen = False
+        col_lo = 0.0
+        col_hi = 0.0
+        for i in range(a.shape[0]):
+            x = a[i, j]
+            if np.isnan(x):
+                continue
+            if not seen:
+                col_lo = x
+                col_hi = x
+                seen = True
+            elif x < col_lo:
+                col_lo = x
+            elif x > col_hi:
+                col_hi = x
+        if seen:
+            lo[j] = col_lo
+            hi[j] = col_hi
+    return lo, hi
+
+
+@njit(cache=True)
+def _nan_column_bin_counts(a, edges):
+    # _uniform_bin_counts per column, skipping NaN
+    ncols = a.shape[1]
+    bins = edges.shape[1] - 1
+    counts = np.zeros((ncols, bins), np.int64)
+    for j in range(ncols):
+        lo = edges[j, 0]
+        width = edges[j, bins] - lo
+        for i in range(a.shape[0]):
+            x = a[i, j]
+            if np.isnan(x):
+                continue
+            idx = int((x - lo) / width * bins)
+            if idx == bins:
+                idx -= 1
+            if x < edges[j, idx]:
+                idx -= 1
+            elif idx != bins - 1 and x >= edges[j, idx + 1]:
+                idx += 1
+            counts[j, idx] += 1
+    return counts
+
+
+def column_ranges(a: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """Per-column (min, max) of a 2D float64 array, ignoring NaN; NaN for all-NaN columns."""
+    return _nan_column_ranges(a)
+
+
+def column_histograms(a: np.ndarray, bins: int, lo: np.ndarray, hi: np.ndarray) -> list:
+    """
+    np.histogram(col[~np.isnan(col)], bins) for every column of a 2D float64
+    array with column_ranges lo/hi, as a list of (counts, edges), without
+    dropping NaN into a copy per column. Columns whose range is not finite,
+    where np.histogram raises, and those too large for the 0.5 widening to
+    register, get None.
+    """
+    # np.histogram gives all-NaN columns the range [0, 1] and widens a
+    # single-valued range by 0.5 on each side
+    empty = np.isnan(lo)
+    lo = np.where(empty, 0.0, lo)
+    hi = np.where(empty, 1.0, hi)
+    flat = lo == hi
+    lo[flat] -= 0.5
+    hi[flat] += 0.5
+    finite = np.isfinite(lo) & np.isfinite(hi) & (lo < hi)
+
+    edges = np.linspace(lo[finite], hi[finite], bins + 1, axis=1)
+    counts = _nan_column_bin_counts(a if finite.all() else a[:, finite], edges)
+    results = [None] * a.shape[1]
+    for k, j in enumerate(np.flatnonzero(finite).tolist()):
+        results[j] = (counts[k], edges[k])
+    return results
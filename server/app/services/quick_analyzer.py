@@ -1,43 +1,13 @@
 """Quick Analysis Service - ML-ready dataset analysis engine."""
 
-from typing import Any, List, Optional
+from typing import List, Optional
 
 import numpy as np
 import pandas as pd
 
-from app.services.dataset_visualizer import get_histogram, get_bar_counts, get_correlation
-
-
-def _make_serializable(value: Any) -> Any:
-    """Convert numpy types to Python native types for JSON serialization."""
-    if isinstance(value, (np.integer,)):
-        return int(value)
-    elif isinstance(value, (np.floating,)):
-        if np.isnan(value) or np.isinf(value):
-            return None
-        return float(value)
-    elif isinstance(value, np.ndarray):
-        return value.tolist()
-    elif pd.isna(value):
-        return None
-    return value
-
-
-def _detect_column_type(series: pd.Series) -> str:
-    """Detect the type of a pandas Series."""
-    if pd.api.types.is_numeric_dtype(series):
-        return "numeric"
-    elif pd.api.types.is_datetime64_any_dtype(series):
-        return "datetime"
-    elif pd.api.types.is_categorical_dtype(series) or pd.api.types.is_object_dtype(series):
-        if series.dtype == object:
-            try:
-                pd.to_datetime(series.dropna().head(100))
-                return "datetime"
-            except (ValueError, TypeError):
-                pass
-        return "categorical"
-    return "unknown"
+from app.services.dataset_profiler import detect_column_type
+from app.services.dataset_visualizer import get_histogram, get_bar_counts, get_correlation, pearson_matrix
+from app.services.numeric_kernels import iqr_outlier_count
 
 
 def _compute_outliers_iqr(series: pd.Series) -> dict:
@@ -62,6 +32,80 @@ def _compute_outliers_iqr(series: pd.Series) -> dict:
     }
 
 
+def _compute_outliers_iqr_batch(df: pd.DataFrame, columns: List[str]) -> dict:
+    """
+    _compute_outliers_iqr for every int/float column, with no Series copies:
+    the iqr_outlier_count kernel reads each column's float64 values once
+    for the present count, quartiles and outlier count. Other columns are
+    left to the per-column version.
+    """
+    results = {}
+    for col in columns:
+        series = df[col]
+        if series.dtype.kind not in "iuf":
+            continue
+        present, outlier_count = iqr_outlier_count(series.to_numpy(dtype=np.float64, na_value=np.nan))
+        results[col] = {
+            "outlier_count": outlier_count,
+            "outlier_percentage": round((outlier_count / present) * 100, 2) if present > 0 else 0.0
+        }
+    return results
+
+
+def _correlation_matrix(numeric_df: pd.DataFrame) -> np.ndarray:
+    """
+    numeric_df.corr() as an array. All-finite int/float/bool columns go
+    through one float64 BLAS product instead of pandas' pairwise loop;
+    missing or infinite values, which corr() skips pairwise, keep its
+    handling.
+    """
+    if all(dtype.kind in "iufb" for dtype in numeric_df.dtypes):
+        values = numeric_df.to_numpy(dtype=np.float64, na_value=np.nan)
+        if np.isfinite(values).all():
+            # The values are reported, so no float32 shortcut for wide frames
+            return pearson_matrix(values, wide_float32=False)
+    return numeric_df.corr().to_numpy()
+
+
+def _count_duplicate_rows(df: pd.DataFrame) -> int:
+    """
+    df.duplicated().sum(), with a row-hash prefilter: only rows whose hash
+    repeats can be duplicates, so duplicated() only has to factorize those.
+    Frames of only integer/bool columns factorize cheaply and skip it.
+    Columns with a numpy dtype are hashed first; the slower object columns
+    are then hashed only for the rows those already pair up.
+    """
+    if len(df) < 2 or all(dtype.kind in "iub" for dtype in df.dtypes):
+        return int(df.duplicated().sum())
+
+    columns = sorted((column.to_numpy() for _, column in df.items()), key=lambda values: values.dtype == object)
+    rows = None  # Positions still in play, once the numpy columns narrow them
+    row_hashes = np.zeros(len(df), dtype=np.uint64)
+    for i, values in enumerate(columns):
+        if i > 0 and values.dtype == object and columns[i - 1].dtype != object:
+            repeated = np.flatnonzero(pd.Series(row_hashes).duplicated(keep=False).to_numpy())
+            if not len(repeated):
+                return 0
+            if len(repeated) <= len(df) // 2:
+                # Worth gathering; otherwise hash the remaining columns whole
+                rows, row_hashes = repeated, row_hashes[repeated]
+        if rows is not None:
+            values = values[rows]
+        if values.dtype.kind in "fc":
+            # Equal rows must hash equal: duplicated() treats -0.0 as 0.0
+            # and every NaN as the same value, so normalize their bits
+            values = np.where(values == values, values + 0.0, np.nan)
+        row_hashes *= np.uint64(1000003)
+        row_hashes += pd.util.hash_array(values)
+
+    candidates = pd.Series(row_hashes).duplicated(keep=False).to_numpy()
+    if not candidates.any():
+        return 0
+    if rows is not None:
+        return int(df.iloc[rows[candidates]].duplicated().sum())
+    return int(df[candidates].duplicated().sum())
+
+
 def _compute_ml_readiness(
     missing_percentages: List[float],
     duplicate_rows: int,
@@ -104,25 +148,23 @@ def _compute_ml_readiness(
 def quick_analyze_dataframe(df: pd.DataFrame) -> dict:
     """
     Perform comprehensive quick analysis of a DataFrame.
-    Returns structured JSON for frontend consumption.
+    Returns structured JSON for frontend consumption, already in the exact
+    shape of QuickAnalysisResponse: the route sends it without re-validating.
     """
     row_count = len(df)
     column_count = len(df.columns)
-    duplicate_rows = int(df.duplicated().sum())
+    duplicate_rows = _count_duplicate_rows(df)
     
-    # Classify columns
-    numeric_columns = []
-    categorical_columns = []
-    datetime_columns = []
+    # Column names as reported, stringified once for every section below
+    col_names = list(map(str, df.columns))
     
-    for col in df.columns:
-        col_type = _detect_column_type(df[col])
-        if col_type == "numeric":
-            numeric_columns.append(str(col))
-        elif col_type == "categorical":
-            categorical_columns.append(str(col))
-        elif col_type == "datetime":
-            datetime_columns.append(str(col))
+    # Classify columns, with the same dtype-kind detection as the profiler
+    typed_columns = {"numeric": [], "categorical": [], "datetime": [], "unknown": []}
+    for name, (_, series) in zip(col_names, df.items()):
+        typed_columns[detect_column_type(series)].append(name)
+    numeric_columns = typed_columns["numeric"]
+    categorical_columns = typed_columns["categorical"]
+    datetime_columns = typed_columns["datetime"]
     
     # ===== 1. Dataset Overview =====
     dataset_overview = {
@@ -141,28 +183,32 @@ def quick_analyze_dataframe(df: pd.DataFrame) -> dict:
     }
     missing_percentages = []
     
-    for col in df.columns:
-        missing_count = int(df[col].isna().sum())
+    # One vectorized pass instead of an isna() mask per column
+    missing_counts = df.isna().sum().tolist()
+    for name, missing_count in zip(col_names, missing_counts):
         missing_pct = round((missing_count / row_count) * 100, 2) if row_count > 0 else 0.0
         missing_percentages.append(missing_pct)
         
         missing_data_insights["columns"].append({
-            "column": str(col),
+            "column": name,
             "missing_count": missing_count,
             "missing_percentage": missing_pct
         })
         
         if missing_pct > 30:
-            missing_data_insights["columns_above_30_percent_missing"].append(str(col))
+            missing_data_insights["columns_above_30_percent_missing"].append(name)
     
     # ===== 3. Key Distributions =====
-    key_distributions = {}
+    key_distributions = {
+        "primary_numeric_histogram": None,
+        "primary_categorical_bar": None
+    }
     
     # Primary numeric column histogram
     if numeric_columns:
         primary_numeric = numeric_columns[0]
         try:
-            hist_data = get_histogram(df, primary_numeric, bins=10)
+            hist_data = get_histogram(df, primary_numeric, bins=10, display_precision=False)
             key_distributions["primary_numeric_histogram"] = hist_data
         except Exception:
             key_distributions["primary_numeric_histogram"] = None
@@ -183,22 +229,25 @@ def quick_analyze_dataframe(df: pd.DataFrame) -> dict:
     if len(numeric_columns) >= 2:
         try:
             numeric_df = df[numeric_columns]
-            corr_matrix = numeric_df.corr()
+            corr_values = _correlation_matrix(numeric_df)
+            # Selecting by numeric_columns succeeded, so the labels are those strings
+            names = numeric_df.columns.tolist()
             
-            # Get all correlations (excluding self-correlations)
-            for i, col_a in enumerate(corr_matrix.columns):
-                for j, col_b in enumerate(corr_matrix.columns):
-                    if i < j:  # Only upper triangle
-                        corr_val = corr_matrix.iloc[i, j]
-                        if not pd.isna(corr_val):
-                            all_correlations.append({
-                                "column_a": str(col_a),
-                                "column_b": str(col_b),
-                                "correlation": _make_serializable(round(corr_val, 4))
-                            })
+            # All correlations (upper triangle, excluding self-correlations),
+            # read off the matrix in one indexing step
+            rows, cols = np.triu_indices(len(names), k=1)
+            pair_values = corr_values[rows, cols]
+            present = ~np.isnan(pair_values)
+            rows, cols = rows[present], cols[present]
+            rounded = np.round(pair_values[present], 4)
             
-            # Sort by absolute correlation
-            all_correlations.sort(key=lambda x: abs(x["correlation"] or 0), reverse=True)
+            # Sort by absolute correlation; a stable sort keeps ties in
+            # upper-triangle order
+            order = np.argsort(-np.abs(rounded), kind="stable")
+            all_correlations = [
+                {"column_a": names[i], "column_b": names[j], "correlation": value}
+                for i, j, value in zip(rows[order].tolist(), cols[order].tolist(), rounded[order].tolist())
+            ]
             strongest_correlations = all_correlations[:5]  # Top 5
         except Exception:
             pass
@@ -207,9 +256,10 @@ def quick_analyze_dataframe(df: pd.DataFrame) -> dict:
     outlier_detection = []
     outlier_percentages = []
     
+    batched_outliers = _compute_outliers_iqr_batch(df, numeric_columns)
     for col in numeric_columns:
         try:
-            outlier_info = _compute_outliers_iqr(df[col])
+            outlier_info = batched_outliers.get(col) or _compute_outliers_iqr(df[col])
             outlier_detection.append({
                 "column": col,
                 "outlier_count": outlier_info["outlier_count"],
@@ -237,7 +287,7 @@ def quick_analyze_dataframe(df: pd.DataFrame) -> dict:
     # Histograms for top 3 numeric columns
     for col in numeric_columns[:3]:
         try:
-            hist_data = get_histogram(df, col, bins=10)
+            hist_data = get_histogram(df, col, bins=10, display_precision=False)
             if hist_data:
                 chart_payloads["histograms"].append(hist_data)
         except Exception: